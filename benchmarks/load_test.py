@@ -0,0 +1,562 @@
+"""Replay synthetic panel traffic against the integration without a broker.
+
+MQTT is replaced by an in-process stand-in and the light, cover and climate
+services by counting stubs, so this runs on any machine with Home Assistant
+installed. Results are written as JSON to compare releases.
+
+Usage: python benchmarks/load_test.py [--panels N] [--entities N]
+       [--messages N] [--output results.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable
+from datetime import UTC, datetime
+import json
+from pathlib import Path
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, NamedTuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from homeassistant.components import mqtt  # noqa: E402
+from homeassistant.config_entries import ConfigEntries  # noqa: E402
+from homeassistant.const import __version__ as HA_VERSION  # noqa: E402
+from homeassistant.core import HomeAssistant, ServiceCall, callback  # noqa: E402
+
+from custom_components.nspanelpro import (  # noqa: E402
+    _async_setup_mqtt_bridge,
+    _async_setup_panel_config,
+)
+from custom_components.nspanelpro.const import (  # noqa: E402
+    CONF_DELTA_UPDATES,
+    CONF_PANEL_ID,
+    CONF_PAYLOAD_ENCODING,
+    DOMAIN,
+    MQTT_BASE_TOPIC,
+    MQTT_CONFIG_TOPIC,
+    PAYLOAD_ENCODINGS,
+)
+from custom_components.nspanelpro.dispatcher import CommandDispatcher  # noqa: E402
+from custom_components.nspanelpro.services import async_setup_services  # noqa: E402
+from custom_components.nspanelpro.state_push import StatePushEngine  # noqa: E402
+
+MANIFEST = (
+    Path(__file__).resolve().parents[1] / "custom_components/nspanelpro/manifest.json"
+)
+
+STUB_SERVICES = {
+    "light": ("turn_on", "turn_off"),
+    "cover": ("open_cover", "close_cover", "stop_cover", "set_cover_position"),
+    "climate": ("set_hvac_mode", "set_preset_mode", "set_temperature"),
+}
+
+# Messages fired before yielding to the event loop, like a busy broker
+# connection delivering a read buffer at once
+FIRE_CHUNK = 50
+
+
+class FakeMessage(NamedTuple):
+    """Message delivered by the MQTT stand-in."""
+
+    topic: str
+    payload: str | bytes
+
+
+def _matches(topic_filter: str, topic: str) -> bool:
+    """Return whether a topic matches a subscription filter."""
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for index, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if index >= len(topic_parts) or part not in ("+", topic_parts[index]):
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+class FakeMqtt:
+    """In-process stand-in for the MQTT integration.
+
+    Published messages are counted and delivered back to matching
+    subscriptions, like a broker would. Matches are cached per topic so the
+    stand-in adds little to the measured time.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the stand-in."""
+        self.published = 0
+        self.published_bytes = 0
+        self._subscriptions: list[tuple[str, Callable[[FakeMessage], None]]] = []
+        self._matches: dict[str, list[Callable[[FakeMessage], None]]] = {}
+
+    async def async_subscribe(
+        self,
+        hass: HomeAssistant,
+        topic: str,
+        msg_callback: Callable[[FakeMessage], None],
+        qos: int = 0,
+        encoding: str | None = "utf-8",
+    ) -> Callable[[], None]:
+        """Subscribe to a topic filter."""
+        subscription = (topic, msg_callback)
+        self._subscriptions.append(subscription)
+        self._matches.clear()
+
+        def unsubscribe() -> None:
+            self._subscriptions.remove(subscription)
+            self._matches.clear()
+
+        return unsubscribe
+
+    async def async_publish(
+        self,
+        hass: HomeAssistant,
+        topic: str,
+        payload: str | bytes,
+        qos: int | None = 0,
+        retain: bool | None = False,
+        encoding: str | None = "utf-8",
+    ) -> None:
+        """Count a published message and deliver it to subscribers."""
+        self.published += 1
+        self.published_bytes += len(
+            payload if isinstance(payload, bytes) else payload.encode()
+        )
+        self.async_fire(topic, payload)
+
+    @callback
+    def async_fire(self, topic: str, payload: str | bytes) -> None:
+        """Deliver a message to the matching subscriptions."""
+        if (callbacks := self._matches.get(topic)) is None:
+            callbacks = self._matches[topic] = [
+                msg_callback
+                for topic_filter, msg_callback in self._subscriptions
+                if _matches(topic_filter, topic)
+            ]
+        message = FakeMessage(topic, payload)
+        for msg_callback in callbacks:
+            msg_callback(message)
+
+    def reset(self) -> None:
+        """Reset the publish counters."""
+        self.published = 0
+        self.published_bytes = 0
+
+
+class ServiceStubs:
+    """Count the service calls made for panel commands."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        stub_services: dict[str, tuple[str, ...]] = STUB_SERVICES,
+    ) -> None:
+        """Register the stubs."""
+        self.hass = hass
+        self.calls = 0
+        self.entities = 0
+        self.last_call = 0.0
+        for domain, services in stub_services.items():
+            for service in services:
+                hass.services.async_register(domain, service, self._async_handle)
+
+    @callback
+    def _async_handle(self, call: ServiceCall) -> None:
+        """Count a service call."""
+        entity_id = call.data.get("entity_id", [])
+        self.calls += 1
+        self.entities += 1 if isinstance(entity_id, str) else len(entity_id)
+        self.last_call = self.hass.loop.time()
+
+    def reset(self) -> None:
+        """Reset the counters."""
+        self.calls = 0
+        self.entities = 0
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop runs a periodic timer."""
+
+    def __init__(self, interval: float = 0.001) -> None:
+        """Initialize the monitor."""
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _async_run(self) -> None:
+        """Sleep repeatedly and record the oversleep."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(loop.time() - start - self.interval)
+
+    def start(self) -> None:
+        """Start measuring."""
+        self.samples = []
+        self._task = asyncio.create_task(self._async_run())
+
+    async def async_stop(self) -> dict[str, float]:
+        """Stop measuring and return lag percentiles in milliseconds."""
+        assert self._task is not None
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        samples = sorted(self.samples) or [0.0]
+        return {
+            "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+            "p99_ms": round(samples[int(len(samples) * 0.99)] * 1000, 3),
+            "max_ms": round(samples[-1] * 1000, 3),
+        }
+
+
+class Bench:
+    """A Home Assistant instance with panels set up on the MQTT stand-in."""
+
+    def __init__(self, hass: HomeAssistant, fake: FakeMqtt, stubs: ServiceStubs):
+        """Initialize the bench."""
+        self.hass = hass
+        self.fake = fake
+        self.stubs = stubs
+        self.panels: list[str] = []
+
+    @property
+    def dispatcher(self) -> CommandDispatcher:
+        """Return the shared command dispatcher."""
+        return self.hass.data[DOMAIN]["dispatcher"]
+
+    async def async_add_panel(
+        self, options: dict[str, Any], panel_id: str | None = None
+    ) -> str:
+        """Set up a panel like a config entry would, without the frontend."""
+        if panel_id is None:
+            panel_id = f"panel{len(self.panels)}"
+        entry = SimpleNamespace(
+            entry_id=f"bench_{panel_id}",
+            data={CONF_PANEL_ID: panel_id},
+            options=options,
+        )
+        self.hass.data[DOMAIN][entry.entry_id] = {
+            "subscriptions": [],
+            "config": dict(entry.data),
+        }
+        await _async_setup_mqtt_bridge(self.hass, entry)
+        state_push = StatePushEngine(self.hass, entry)
+        await state_push.async_start()
+        self.hass.data[DOMAIN][entry.entry_id]["state_push"] = state_push
+        await _async_setup_panel_config(self.hass, entry)
+        self.panels.append(panel_id)
+        return panel_id
+
+    async def async_drain(self) -> None:
+        """Wait until every submitted command has been executed."""
+        dispatcher = self.dispatcher
+        settle = dispatcher.coalescer.interval + dispatcher.batch_window + 0.01
+        while True:
+            await self.hass.async_block_till_done()
+            queue = dispatcher.async_get_queue()
+            if queue.depth or queue.active:
+                await asyncio.sleep(0.001)
+                continue
+            # Trailing slider values and collected calls are sent on timers
+            await asyncio.sleep(settle)
+            await self.hass.async_block_till_done()
+            if not queue.depth and not queue.active:
+                return
+
+    async def async_fire(self, messages: list[tuple[str, str]]) -> None:
+        """Deliver panel messages in chunks."""
+        fire = self.fake.async_fire
+        for start in range(0, len(messages), FIRE_CHUNK):
+            for topic, payload in messages[start : start + FIRE_CHUNK]:
+                fire(topic, payload)
+            await asyncio.sleep(0)
+
+
+def _command_messages(
+    rng: random.Random, entities: int, count: int
+) -> list[tuple[str, str]]:
+    """Return a mix of switch and slider commands on random entities."""
+    base = f"{MQTT_BASE_TOPIC}/cmd"
+    makers: list[Callable[[int], tuple[str, str]]] = [
+        lambda i: (f"{base}/light/bench_{i}/set", rng.choice(("ON", "OFF"))),
+        lambda i: (f"{base}/light/bench_{i}/brightness", str(rng.randrange(256))),
+        lambda i: (f"{base}/cover/bench_{i}/position", str(rng.randrange(101))),
+        lambda i: (
+            f"{base}/climate/bench_{i}/temperature", f"{rng.uniform(16, 25):.1f}"
+        ),
+        lambda i: (f"{base}/climate/bench_{i}/mode", rng.choice(("heat", "off"))),
+    ]
+    return [rng.choice(makers)(rng.randrange(entities)) for _ in range(count)]
+
+
+def _slider_messages(entities: int, count: int) -> list[tuple[str, str]]:
+    """Return brightness drags of 0 to 255 on a few entities."""
+    base = f"{MQTT_BASE_TOPIC}/cmd/light"
+    return [
+        (f"{base}/bench_{(i // 256) % entities}/brightness", str(i % 256))
+        for i in range(count)
+    ]
+
+
+async def _async_measure(
+    bench: Bench, run: Callable[[], Any], count: int
+) -> dict[str, Any]:
+    """Run a workload and return its throughput and event loop lag."""
+    bench.fake.reset()
+    bench.stubs.reset()
+    loop = asyncio.get_running_loop()
+    monitor = LoopLagMonitor()
+    monitor.start()
+    start = loop.time()
+    await run()
+    elapsed = loop.time() - start
+    lag = await monitor.async_stop()
+    if bench.stubs.calls:
+        # Exclude the settle time of the drain after the last service call
+        elapsed = bench.stubs.last_call - start
+    elapsed = max(elapsed, 1e-9)
+    return {
+        "messages": count,
+        "seconds": round(elapsed, 4),
+        "messages_per_second": round(count / elapsed),
+        "service_calls": bench.stubs.calls,
+        "service_call_entities": bench.stubs.entities,
+        "published": bench.fake.published,
+        "published_bytes": bench.fake.published_bytes,
+        "loop_lag": lag,
+    }
+
+
+async def _async_allocations(run: Callable[[], Any], count: int) -> dict[str, float]:
+    """Return memory blocks and bytes allocated per message by a workload."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    await run()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    allocated = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    return {
+        "retained_blocks_per_message": round(blocks / count, 3),
+        "retained_bytes_per_message": round(allocated / count, 1),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+async def _async_scenario(
+    bench: Bench,
+    factory: Callable[[], Callable[[], Any]],
+    count: int,
+    allocations: bool,
+) -> dict[str, Any]:
+    """Measure a workload, then its allocations in a second run."""
+    result = await _async_measure(bench, factory(), count)
+    if allocations:
+        result["allocations"] = await _async_allocations(factory(), count)
+    return result
+
+
+async def _async_run(args: argparse.Namespace) -> dict[str, Any]:
+    """Set up the bench and run every scenario."""
+    fake = FakeMqtt()
+    mqtt.async_subscribe = fake.async_subscribe
+    mqtt.async_publish = fake.async_publish
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        hass.config_entries = ConfigEntries(hass, {})
+        hass.data[DOMAIN] = {}
+        await async_setup_services(hass)
+        bench = Bench(hass, fake, ServiceStubs(hass))
+
+        options = {
+            CONF_PAYLOAD_ENCODING: args.encoding,
+            CONF_DELTA_UPDATES: args.delta,
+        }
+        for _ in range(args.panels):
+            await bench.async_add_panel(options)
+        # Measure the pipeline, not the production rate limit
+        bench.dispatcher.shared.queue.async_configure(
+            args.messages, args.workers, 1e9, "coalesce"
+        )
+
+        rng = random.Random(args.seed)
+        entity_ids = [f"light.bench_{index}" for index in range(args.entities)]
+        for entity_id in entity_ids:
+            hass.states.async_set(entity_id, "off", {"brightness": 0})
+        # Commands for entities that do not exist are rejected early
+        for index in range(args.entities):
+            hass.states.async_set(
+                f"cover.bench_{index}", "open", {"current_position": 100}
+            )
+            hass.states.async_set(
+                f"climate.bench_{index}",
+                "heat",
+                {"hvac_modes": ["heat", "off"], "min_temp": 7, "max_temp": 35},
+            )
+
+        scenarios: dict[str, Any] = {}
+
+        # One command with every panel set up must reach the services once
+        await bench.async_fire(
+            [(f"{MQTT_BASE_TOPIC}/cmd/light/bench_0/set", "ON")]
+        )
+        await bench.async_drain()
+        scenarios["single_dispatch"] = {
+            "panels": args.panels,
+            "service_calls": bench.stubs.calls,
+            "ok": bench.stubs.calls == 1,
+        }
+
+        def commands() -> Callable[[], Any]:
+            messages = _command_messages(rng, args.entities, args.messages)
+
+            async def run() -> None:
+                await bench.async_fire(messages)
+                await bench.async_drain()
+
+            return run
+
+        shared = bench.dispatcher.shared
+        rejected, skipped = shared.rejected, shared.skipped
+        scenarios["commands"] = await _async_scenario(
+            bench, commands, args.messages, args.allocations
+        )
+        # Commands and group members that never reached a service call
+        scenarios["commands"]["rejected"] = shared.rejected - rejected
+        scenarios["commands"]["skipped_targets"] = shared.skipped - skipped
+
+        def slider_bursts() -> Callable[[], Any]:
+            messages = _slider_messages(min(args.entities, 8), args.messages)
+
+            async def run() -> None:
+                await bench.async_fire(messages)
+                await bench.async_drain()
+
+            return run
+
+        scenarios["slider_bursts"] = await _async_scenario(
+            bench, slider_bursts, args.messages, args.allocations
+        )
+
+        # Before state pushes, which would count as late state changes
+        scenarios["command_latency"] = bench.dispatcher.latency.async_stats()
+
+        # Every panel shows every entity
+        config = json.dumps({"entities": {"lights": entity_ids}})
+        for panel_id in bench.panels:
+            fake.async_fire(MQTT_CONFIG_TOPIC.format(panel_id=panel_id), config)
+        await hass.async_block_till_done()
+
+        updates = args.messages
+        counter = iter(range(1, 1 << 62))
+
+        def state_push() -> Callable[[], Any]:
+            async def run() -> None:
+                for index in range(updates):
+                    hass.states.async_set(
+                        entity_ids[index % len(entity_ids)],
+                        "on",
+                        {"brightness": next(counter) % 256},
+                    )
+                    if not index % FIRE_CHUNK:
+                        await asyncio.sleep(0)
+                await hass.async_block_till_done()
+
+            return run
+
+        scenarios["state_push"] = await _async_scenario(
+            bench, state_push, updates, args.allocations
+        )
+
+        def snapshot() -> Callable[[], Any]:
+            async def run() -> None:
+                for panel_id in bench.panels:
+                    await hass.services.async_call(
+                        DOMAIN,
+                        "publish_snapshot",
+                        {"panel_id": panel_id},
+                        blocking=True,
+                    )
+
+            return run
+
+        scenarios["snapshot"] = await _async_scenario(
+            bench, snapshot, len(bench.panels), args.allocations
+        )
+
+        for data in list(hass.data[DOMAIN].values()):
+            if isinstance(data, dict):
+                for unsubscribe in data["subscriptions"]:
+                    unsubscribe()
+                data["state_push"].async_stop()
+        await hass.async_block_till_done()
+        await hass.async_stop(force=True)
+
+    return scenarios
+
+
+def main() -> None:
+    """Run the load test and write the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--panels", type=int, default=10)
+    parser.add_argument("--entities", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--encoding", choices=PAYLOAD_ENCODINGS, default=PAYLOAD_ENCODINGS[0]
+    )
+    parser.add_argument("--delta", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument(
+        "--no-allocations",
+        dest="allocations",
+        action="store_false",
+        help="skip the allocation runs, which are slow",
+    )
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    started = time.time()
+    scenarios = asyncio.run(_async_run(args))
+    results = {
+        "version": json.loads(MANIFEST.read_text())["version"],
+        "home_assistant": HA_VERSION,
+        "python": platform.python_version(),
+        "started": datetime.fromtimestamp(started, UTC).isoformat(),
+        "parameters": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+        },
+        "scenarios": scenarios,
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text + "\n")
+        for name, result in scenarios.items():
+            if "messages_per_second" in result:
+                print(f"{name:<16}{result['messages_per_second']:>12,} msg/s")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
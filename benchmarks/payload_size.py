@@ -0,0 +1,132 @@
+"""Measure state payload bytes per update for each encoding.
+
+Usage: python benchmarks/payload_size.py
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from homeassistant.core import State  # noqa: E402
+
+from custom_components.nspanelpro.const import PAYLOAD_ENCODINGS  # noqa: E402
+from custom_components.nspanelpro.encoder import (  # noqa: E402
+    PROJECTIONS,
+    StateEncoder,
+)
+
+SAMPLE_STATES = [
+    State(
+        "light.living_room",
+        "on",
+        {
+            "min_color_temp_kelvin": 2000,
+            "max_color_temp_kelvin": 6535,
+            "min_mireds": 153,
+            "max_mireds": 500,
+            "effect_list": ["colorloop", "random", "candle", "fireplace"],
+            "supported_color_modes": ["color_temp", "xy"],
+            "effect": None,
+            "color_mode": "color_temp",
+            "brightness": 180,
+            "color_temp_kelvin": 2702,
+            "color_temp": 370,
+            "hs_color": [29.79, 65.05],
+            "rgb_color": [255, 167, 89],
+            "xy_color": [0.524, 0.387],
+            "friendly_name": "Living Room Ceiling",
+            "supported_features": 44,
+        },
+    ),
+    State(
+        "cover.bedroom_blinds",
+        "open",
+        {
+            "current_position": 62,
+            "current_tilt_position": 40,
+            "device_class": "blind",
+            "friendly_name": "Bedroom Blinds",
+            "supported_features": 255,
+        },
+    ),
+    State(
+        "climate.living_room",
+        "heat",
+        {
+            "hvac_modes": ["off", "heat", "cool", "heat_cool", "auto", "dry", "fan_only"],
+            "min_temp": 7,
+            "max_temp": 35,
+            "target_temp_step": 0.5,
+            "fan_modes": ["auto", "low", "medium", "high"],
+            "preset_modes": ["none", "away", "eco", "boost", "comfort", "home", "sleep"],
+            "swing_modes": ["off", "vertical", "horizontal", "both"],
+            "current_temperature": 20.6,
+            "temperature": 21.5,
+            "target_temp_high": None,
+            "target_temp_low": None,
+            "current_humidity": 47,
+            "fan_mode": "auto",
+            "hvac_action": "heating",
+            "preset_mode": "comfort",
+            "swing_mode": "off",
+            "friendly_name": "Living Room Thermostat",
+            "supported_features": 441,
+        },
+    ),
+]
+
+
+def _unshown_change(state: State) -> State | None:
+    """Return a later state changing only an attribute the panel does not show."""
+    projection = PROJECTIONS[state.domain]
+    shown = projection.update + projection.sync
+    if (name := next((n for n in state.attributes if n not in shown), None)) is None:
+        return None
+    return State(
+        state.entity_id,
+        state.state,
+        {**state.attributes, name: "changed"},
+        last_updated=state.last_updated + timedelta(minutes=1),
+    )
+
+
+def main() -> None:
+    """Print bytes per update for every encoding and sample entity.
+
+    ``unshown`` is what a change of an attribute the panel does not show
+    publishes.
+    """
+    baseline: dict[str, int] = {}
+    print(
+        f"{'entity':<24}{'encoding':<14}{'full':>8}{'update':>8}{'ratio':>8}"
+        f"{'unshown':>9}"
+    )
+    for state in SAMPLE_STATES:
+        later = _unshown_change(state)
+        for encoding in PAYLOAD_ENCODINGS:
+            encoder = StateEncoder(encoding)
+            if encoder.encoding != encoding:
+                continue  # optional encoder library not installed
+            full = len(encoder.encode(state, full=True))
+            update = len(encoder.encode(state, full=False))
+            baseline.setdefault(state.entity_id, update)
+            ratio = baseline[state.entity_id] / update
+            unshown = "-"
+            if later is not None:
+                payload = encoder.build(later, full=False)
+                unshown = (
+                    0
+                    if encoder.unchanged(encoder.build(state, full=False), payload)
+                    else len(encoder.dumps(payload))
+                )
+            print(
+                f"{state.entity_id:<24}{encoder.encoding:<14}"
+                f"{full:>8}{update:>8}{ratio:>7.1f}x{unshown:>9}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Replay a command journal against the integration without a broker.
+
+The journal is recorded by the integration when the command journal option
+is enabled. Commands are fed to the dispatcher through the MQTT stand-in of
+the load test, at the recorded pace, faster, or as fast as possible, and
+every entity they target is created. Pass the rotated files oldest first.
+
+Usage: python benchmarks/replay_journal.py nspanelpro_journal.bin.1
+       nspanelpro_journal.bin [--speed N] [--max-gap S] [--output results.json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import UTC, datetime
+import json
+from pathlib import Path
+import platform
+import sys
+import tempfile
+import time
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from homeassistant.components import mqtt  # noqa: E402
+from homeassistant.config_entries import ConfigEntries  # noqa: E402
+from homeassistant.const import __version__ as HA_VERSION  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.nspanelpro.commands import (  # noqa: E402
+    COMMAND_PATTERNS,
+    COMMANDS,
+)
+from custom_components.nspanelpro.const import (  # noqa: E402
+    CONF_TOPIC_LAYOUT,
+    DOMAIN,
+    MQTT_BASE_TOPIC,
+    TOPIC_LAYOUT_PANEL,
+)
+from custom_components.nspanelpro.journal import read_journal  # noqa: E402
+from custom_components.nspanelpro.router import TopicRouter  # noqa: E402
+from custom_components.nspanelpro.services import async_setup_services  # noqa: E402
+from load_test import (  # noqa: E402
+    FIRE_CHUNK,
+    MANIFEST,
+    Bench,
+    FakeMqtt,
+    ServiceStubs,
+    _async_measure,
+)
+
+# Panel of the commands on the shared topic layout
+SHARED_PANEL = "replay"
+
+
+def _command_services() -> dict[str, tuple[str, ...]]:
+    """Return every service a panel command can call, per domain."""
+    services: dict[str, set[str]] = {}
+    for spec in COMMANDS:
+        names = services.setdefault(spec.domain, set())
+        if spec.service is not None:
+            names.add(spec.service)
+        if spec.actions is not None:
+            names.update(spec.actions.values())
+    return {domain: tuple(sorted(names)) for domain, names in services.items()}
+
+
+def _panel_of(topic: str) -> str | None:
+    """Return the panel of a topic on the panel layout, None if shared."""
+    parts = topic.removeprefix(f"{MQTT_BASE_TOPIC}/").split("/")
+    if len(parts) > 1 and parts[0] != "cmd" and parts[1] == "cmd":
+        return parts[0]
+    return None
+
+
+def _targets(records: list[tuple[float, str, str]]) -> dict[str | None, set[str]]:
+    """Return the entities commanded per panel, None for the shared layout."""
+    routers: dict[str | None, TopicRouter] = {}
+    targets: dict[str | None, set[str]] = {}
+    for _, topic, payload in records:
+        panel = _panel_of(topic)
+        if (router := routers.get(panel)) is None:
+            prefix = None if panel is None else f"{MQTT_BASE_TOPIC}/{panel}/cmd/"
+            router = routers[panel] = TopicRouter(COMMAND_PATTERNS, prefix=prefix)
+        entity_ids = targets.setdefault(panel, set())
+        if (route := router.parse(topic)) is None:
+            continue
+        if route.entity_id is not None:
+            entity_ids.add(route.entity_id)
+            continue
+        # Group commands list their members, named groups are not known
+        try:
+            members = json.loads(payload).get("entity_id", [])
+        except (ValueError, AttributeError):
+            continue
+        if isinstance(members, list):
+            entity_ids.update(
+                member if "." in member else f"{route.domain}.{member}"
+                for member in members
+                if isinstance(member, str)
+            )
+    return targets
+
+
+async def _async_replay(
+    bench: Bench,
+    records: list[tuple[float, str, str]],
+    speed: float,
+    max_gap: float,
+) -> None:
+    """Fire the journaled commands at their recorded pace divided by speed."""
+    loop = asyncio.get_running_loop()
+    fire = bench.fake.async_fire
+    if speed <= 0:
+        await bench.async_fire([(topic, payload) for _, topic, payload in records])
+        return
+
+    due = loop.time()
+    previous = records[0][0]
+    for index, (received, topic, payload) in enumerate(records):
+        # Clock jumps between Home Assistant runs are capped as well
+        due += min(max(received - previous, 0), max_gap) / speed
+        previous = received
+        if (wait := due - loop.time()) > 0:
+            await asyncio.sleep(wait)
+        elif not index % FIRE_CHUNK:
+            await asyncio.sleep(0)
+        fire(topic, payload)
+
+
+async def _async_drain(bench: Bench, panels: list[str]) -> None:
+    """Wait until the commands of every panel have been executed."""
+    dispatcher = bench.dispatcher
+    settle = dispatcher.coalescer.interval + dispatcher.batch_window + 0.01
+    queues = [dispatcher.async_get_queue(panel_id) for panel_id in panels]
+    while True:
+        await bench.hass.async_block_till_done()
+        if any(queue.depth or queue.active for queue in queues):
+            await asyncio.sleep(0.001)
+            continue
+        await asyncio.sleep(settle)
+        await bench.hass.async_block_till_done()
+        if not any(queue.depth or queue.active for queue in queues):
+            return
+
+
+async def _async_run(args: argparse.Namespace) -> dict[str, Any]:
+    """Set up a panel per journaled namespace and replay the journal."""
+    records = [record for path in args.journal for record in read_journal(path)]
+    if not records:
+        raise SystemExit("The journal holds no commands")
+
+    fake = FakeMqtt()
+    mqtt.async_subscribe = fake.async_subscribe
+    mqtt.async_publish = fake.async_publish
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        hass.config_entries = ConfigEntries(hass, {})
+        hass.data[DOMAIN] = {}
+        await async_setup_services(hass)
+        bench = Bench(hass, fake, ServiceStubs(hass, _command_services()))
+
+        targets = _targets(records)
+        panels: list[str] = []
+        for panel, entity_ids in targets.items():
+            for entity_id in entity_ids:
+                hass.states.async_set(entity_id, "off")
+            if panel is None:
+                panels.append(await bench.async_add_panel({}, SHARED_PANEL))
+                continue
+            panels.append(
+                await bench.async_add_panel(
+                    {CONF_TOPIC_LAYOUT: TOPIC_LAYOUT_PANEL}, panel
+                )
+            )
+            bench.dispatcher.async_set_allowed(panel, entity_ids)
+
+        if args.unlimited:
+            # Measure the pipeline, not the production rate limit
+            for panel_id in panels:
+                bench.dispatcher.async_get_queue(panel_id).async_configure(
+                    len(records), args.workers, 1e9, "coalesce"
+                )
+
+        async def run() -> None:
+            await _async_replay(bench, records, args.speed, args.max_gap)
+            await _async_drain(bench, panels)
+
+        result = await _async_measure(bench, run, len(records))
+        scopes = [bench.dispatcher.async_get_scope(panel_id) for panel_id in panels]
+        result["rejected"] = sum(scope.rejected for scope in scopes)
+        result["skipped_targets"] = sum(scope.skipped for scope in scopes)
+        result["dropped"] = sum(scope.queue.dropped for scope in scopes)
+        result["coalesced"] = sum(scope.coalesced for scope in scopes)
+        result["recorded_seconds"] = round(records[-1][0] - records[0][0], 3)
+
+        for data in list(hass.data[DOMAIN].values()):
+            if isinstance(data, dict) and "subscriptions" in data:
+                for unsubscribe in data["subscriptions"]:
+                    unsubscribe()
+                data["state_push"].async_stop()
+        await hass.async_block_till_done()
+        await hass.async_stop(force=True)
+
+    return result
+
+
+def main() -> None:
+    """Replay a journal and write the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("journal", nargs="+", type=Path)
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="replay speed factor, 0 fires the commands as fast as possible",
+    )
+    parser.add_argument(
+        "--max-gap",
+        type=float,
+        default=5.0,
+        help="longest pause between two commands in recorded seconds",
+    )
+    parser.add_argument(
+        "--unlimited",
+        action="store_true",
+        help="lift the command queue rate limit to measure the pipeline",
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    started = time.time()
+    replay = asyncio.run(_async_run(args))
+    results = {
+        "version": json.loads(MANIFEST.read_text())["version"],
+        "home_assistant": HA_VERSION,
+        "python": platform.python_version(),
+        "started": datetime.fromtimestamp(started, UTC).isoformat(),
+        "journal": [str(path) for path in args.journal],
+        "speed": args.speed,
+        "replay": replay,
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text + "\n")
+        print(f"replay          {replay['messages_per_second']:>12,} msg/s")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
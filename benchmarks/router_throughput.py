@@ -0,0 +1,63 @@
+"""Measure command topic routing throughput in messages per second.
+
+Usage: python benchmarks/router_throughput.py [--entities N] [--messages N]
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from custom_components.nspanelpro.commands import COMMAND_PATTERNS  # noqa: E402
+from custom_components.nspanelpro.const import MQTT_BASE_TOPIC  # noqa: E402
+from custom_components.nspanelpro.router import TopicRouter  # noqa: E402
+
+
+def _split_route(topic: str) -> tuple[str, str, str] | None:
+    """Route a topic the way the bridge did before the router existed."""
+    topic_parts = topic.split("/")
+    if len(topic_parts) != 6:
+        return None
+    domain, entity_name, action = topic_parts[3:]
+    return f"{domain}.{entity_name}", domain, action
+
+
+def _measure(name: str, route, topics: list[str]) -> None:
+    """Route all topics and print the achieved rate."""
+    start = time.perf_counter()
+    for topic in topics:
+        route(topic)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28}{len(topics) / elapsed:>14,.0f} msg/s")
+
+
+def main() -> None:
+    """Run the router benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entities", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=500_000)
+    args = parser.parse_args()
+
+    commands = [
+        pattern.replace("+", f"entity_{index}")
+        for index in range(args.entities)
+        for pattern in COMMAND_PATTERNS
+    ]
+    topics = [commands[i % len(commands)] for i in range(args.messages)]
+    malformed = [
+        f"{MQTT_BASE_TOPIC}/cmd/light/entity_{i % args.entities}/set/extra"
+        for i in range(args.messages)
+    ]
+
+    _measure("split (baseline)", _split_route, topics)
+    _measure("router, cold cache", TopicRouter(COMMAND_PATTERNS, 1).parse, topics)
+    warm = TopicRouter(COMMAND_PATTERNS, len(commands))
+    _measure("router, warm cache", warm.parse, topics)
+    _measure("router, malformed topics", warm.parse, malformed)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,54 +3,93 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+import time
 from typing import Any
 
-from homeassistant.components import mqtt
+from homeassistant.components import persistent_notification
 from homeassistant.components.frontend import async_register_built_in_panel
 from homeassistant.components.http import StaticPathConfig
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.start import async_at_started
 from homeassistant.helpers.typing import ConfigType
 
+from .config_store import PanelConfigStore
 from .const import (
     DOMAIN,
+    CONF_BATCH_WINDOW,
+    CONF_COMMAND_JOURNAL,
+    CONF_COMMAND_RATE,
+    CONF_PANEL_ID,
+    CONF_QUEUE_OVERFLOW,
+    CONF_QUEUE_RATE,
+    CONF_QUEUE_SIZE,
+    CONF_QUEUE_WORKERS,
+    CONF_TOPIC_LAYOUT,
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_COMMAND_JOURNAL,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_QUEUE_OVERFLOW,
+    DEFAULT_QUEUE_RATE,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_QUEUE_WORKERS,
+    DEFAULT_TOPIC_LAYOUT,
+    JOURNAL_FILE,
     MQTT_BASE_TOPIC,
-    MQTT_CMD_LIGHT_SET,
-    MQTT_CMD_LIGHT_BRIGHTNESS,
-    MQTT_CMD_COVER_SET,
-    MQTT_CMD_COVER_POSITION,
-    MQTT_CMD_CLIMATE_MODE,
-    MQTT_CMD_CLIMATE_PRESET,
-    MQTT_CMD_CLIMATE_TEMPERATURE,
+    TOPIC_LAYOUT_PANEL,
 )
+from .dispatcher import CommandDispatcher
+from .journal import CommandJournal
+from .panel_config import (
+    async_subscribe_panel_config,
+    entity_ids_from_config,
+    groups_from_config,
+)
+from .presence import PanelPresence
 from .services import async_setup_services, async_unload_services
+from .state_push import StatePushEngine
+from .websocket_api import async_register_websocket_commands
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS: list[Platform] = []
+PLATFORMS: list[Platform] = [Platform.BINARY_SENSOR, Platform.SENSOR]
+
+# Keys in hass.data[DOMAIN] that are shared by all config entries
+_SHARED_DATA_KEYS = (
+    "frontend_registered",
+    "dispatcher",
+    "config_store",
+    "catalog",
+    "stats",
+    "timer_wheel",
+    "shared_sensors",
+)
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the NSPanel Pro component."""
     hass.data.setdefault(DOMAIN, {})
+    async_register_websocket_commands(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up NSPanel Pro from a config entry."""
-    _LOGGER.info("=== async_setup_entry called for entry: %s ===", entry.entry_id)
-    
+    started = time.perf_counter()
+
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
         "subscriptions": [],
         "config": dict(entry.data),
     }
 
-    # Register frontend (only once, protected by guard in the function)
-    _LOGGER.info("About to call _async_register_frontend")
-    await _async_register_frontend(hass)
-    _LOGGER.info("Returned from _async_register_frontend")
+    # Load the published panel configurations (shared by all entries)
+    if "config_store" not in hass.data[DOMAIN]:
+        config_store = PanelConfigStore(hass)
+        await config_store.async_load()
+        hass.data[DOMAIN]["config_store"] = config_store
 
     # Set up services
     await async_setup_services(hass)
@@ -58,12 +97,42 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Set up MQTT subscriptions
     await _async_setup_mqtt_bridge(hass, entry)
 
+    # Push state changes of the panel's configured entities
+    state_push = StatePushEngine(hass, entry)
+    await state_push.async_start()
+    hass.data[DOMAIN][entry.entry_id]["state_push"] = state_push
+
+    # Follow whether the panel is connected, pausing pushes while it is not
+    presence = PanelPresence(hass, entry.data[CONF_PANEL_ID])
+    presence.async_add_listener(state_push.async_set_online)
+    await presence.async_start()
+    hass.data[DOMAIN][entry.entry_id]["presence"] = presence
+
+    # Follow the configuration published for the panel
+    await _async_setup_panel_config(hass, entry)
+
     # Forward to platforms if any
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+    # The card is not needed to run the panel, register it once started
+    entry.async_on_unload(async_at_started(hass, _async_register_frontend))
+
+    setup_time = time.perf_counter() - started
+    hass.data[DOMAIN][entry.entry_id]["setup_time"] = setup_time
+    _LOGGER.debug(
+        "Set up panel %s in %.1f ms", entry.data[CONF_PANEL_ID], setup_time * 1000
+    )
+
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the config entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     # Unsubscribe from MQTT topics
@@ -71,42 +140,48 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     for unsubscribe in data.get("subscriptions", []):
         unsubscribe()
 
+    if (state_push := data.get("state_push")) is not None:
+        state_push.async_stop()
+
+    if (presence := data.get("presence")) is not None:
+        presence.async_stop()
+
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+
+        if (dispatcher := hass.data[DOMAIN].get("dispatcher")) is not None:
+            await _async_update_dispatcher(hass, dispatcher)
         
         # Check if there are any config entries left
         # Filter out non-entry keys like 'frontend_registered'
-        has_entries = any(k for k in hass.data[DOMAIN] if k != "frontend_registered")
+        has_entries = any(k for k in hass.data[DOMAIN] if k not in _SHARED_DATA_KEYS)
         
         if not has_entries:
             await async_unload_services(hass)
+            if (catalog := hass.data[DOMAIN].pop("catalog", None)) is not None:
+                catalog.async_stop()
+            if (stats := hass.data[DOMAIN].get("stats")) is not None:
+                stats.async_stop()
 
     return unload_ok
 
 
 async def _async_register_frontend(hass: HomeAssistant) -> None:
     """Register the frontend card."""
-    # Check if already registered to prevent duplicates
+    # Every entry schedules the registration, only the first one runs it
     if hass.data[DOMAIN].get("frontend_registered"):
         _LOGGER.debug("Frontend already registered, skipping")
         return
-    
-    _LOGGER.info("Starting frontend registration for NSPanel Pro")
-    
+    hass.data[DOMAIN]["frontend_registered"] = True
+
     # Serve the card JS from the integration
     card_path = hass.config.path("custom_components/nspanelpro/www/nspanelpro-config-card.js")
-    _LOGGER.debug("Card file path: %s", card_path)
-    
-    # Check if file exists
-    import os
-    if os.path.exists(card_path):
-        _LOGGER.info("Card file exists at: %s", card_path)
-    else:
+    if not await hass.async_add_executor_job(os.path.exists, card_path):
         _LOGGER.error("Card file NOT FOUND at: %s", card_path)
         return
-    
+
     try:
         await hass.http.async_register_static_paths([
             StaticPathConfig(
@@ -115,20 +190,19 @@ async def _async_register_frontend(hass: HomeAssistant) -> None:
                 cache_headers=False,
             )
         ])
-        _LOGGER.info("Successfully registered static path: /nspanelpro/nspanelpro-config-card.js")
+        _LOGGER.debug("Registered static path: /nspanelpro/nspanelpro-config-card.js")
     except RuntimeError as err:
         _LOGGER.warning("Could not register static path (likely already registered): %s", err)
     except Exception as err:
         _LOGGER.error("Unexpected error registering static path: %s", err, exc_info=True)
 
     # Register as a Lovelace resource
-    await _async_add_lovelace_resource(hass)
+    if not await _async_add_lovelace_resource(hass):
+        return
 
-    hass.data[DOMAIN]["frontend_registered"] = True
-    _LOGGER.info("NSPanel Pro frontend card registration complete")
-    
-    # Notify user to refresh browser
-    hass.components.persistent_notification.async_create(
+    # Only a new or updated resource needs the browser to be refreshed
+    persistent_notification.async_create(
+        hass,
         "NSPanel Pro configuration card has been registered.\n\n"
         "**Please refresh your browser (Ctrl+F5 or Cmd+Shift+R)** to load the card.\n\n"
         "Then add the card to your dashboard:\n"
@@ -142,14 +216,14 @@ async def _async_register_frontend(hass: HomeAssistant) -> None:
     )
 
 
-async def _async_add_lovelace_resource(hass: HomeAssistant) -> None:
-    """Add the card to Lovelace resources."""
-    _LOGGER.info("Attempting to register Lovelace resource")
-    
+async def _async_add_lovelace_resource(hass: HomeAssistant) -> bool:
+    """Add the card to Lovelace resources.
+
+    Returns whether the resource was added or updated.
+    """
     # Add version to force cache refresh
-    url = "/nspanelpro/nspanelpro-config-card.js?v=1.0.8"
-    _LOGGER.debug("Resource URL: %s", url)
-    
+    url = "/nspanelpro/nspanelpro-config-card.js?v=1.1.0"
+
     # Get Lovelace resources collection
     # This key is used by the frontend component to store resources
     resources = hass.data.get("lovelace_resources")
@@ -161,40 +235,29 @@ async def _async_add_lovelace_resource(hass: HomeAssistant) -> None:
         _LOGGER.warning("  resources:")
         _LOGGER.warning("    - url: %s", url)
         _LOGGER.warning("      type: module")
-        return
+        return False
 
-    _LOGGER.debug("Lovelace resources collection found")
-    
     # Ensure resources are loaded
     if not resources.loaded:
-        _LOGGER.debug("Loading Lovelace resources...")
         await resources.async_load()
 
-    # List all current resources for debugging
-    current_resources = list(resources.async_items())
-    _LOGGER.debug("Current Lovelace resources count: %d", len(current_resources))
-    for res in current_resources:
-        _LOGGER.debug("  - %s (type: %s)", res.get("url"), res.get("res_type"))
-
     # Check if already exists or needs update
     for resource in resources.async_items():
         if resource["url"].startswith("/nspanelpro/nspanelpro-config-card.js"):
             if resource["url"] == url:
-                _LOGGER.info("Lovelace resource already registered with correct version: %s", url)
-                return
+                _LOGGER.debug("Lovelace resource already registered with correct version: %s", url)
+                return False
             else:
                 # Update existing resource with new version
                 _LOGGER.info("Updating Lovelace resource from %s to %s", resource["url"], url)
                 try:
                     await resources.async_update_item(resource["id"], {"url": url})
-                    _LOGGER.info("Successfully updated Lovelace resource")
-                    return
+                    return True
                 except Exception as err:
                     _LOGGER.error("Could not update Lovelace resource: %s", err, exc_info=True)
-                    return
+                    return False
 
     # Add resource
-    _LOGGER.info("Adding new Lovelace resource: %s", url)
     try:
         await resources.async_create_item({
             "res_type": "module",
@@ -203,161 +266,130 @@ async def _async_add_lovelace_resource(hass: HomeAssistant) -> None:
         _LOGGER.info("Successfully auto-registered Lovelace resource: %s", url)
     except Exception as err:
         _LOGGER.error("Could not auto-register Lovelace resource: %s", err, exc_info=True)
+        return False
+
+    return True
 
 
 async def _async_setup_mqtt_bridge(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Set up MQTT bridge for panel commands."""
-    subscriptions = []
-
-    # Light handlers
-    @callback
-    def handle_light_set(msg: mqtt.ReceiveMessage) -> None:
-        """Handle light on/off commands."""
-        topic_parts = msg.topic.split("/")
-        entity_name = topic_parts[4]  # domodreams/nspanelpro/cmd/light/{entity}/set
-        entity_id = f"light.{entity_name}"
-        payload = msg.payload.lower()
-
-        _LOGGER.debug("Light set command: %s -> %s", entity_id, payload)
-
-        if payload == "on":
-            hass.async_create_task(
-                hass.services.async_call("light", "turn_on", {"entity_id": entity_id})
-            )
-        elif payload == "off":
-            hass.async_create_task(
-                hass.services.async_call("light", "turn_off", {"entity_id": entity_id})
+    # All entries share one dispatcher
+    if (dispatcher := hass.data[DOMAIN].get("dispatcher")) is None:
+        dispatcher = hass.data[DOMAIN]["dispatcher"] = CommandDispatcher(hass)
+
+    subscriptions = hass.data[DOMAIN][entry.entry_id]["subscriptions"]
+    if _topic_layout(entry) == TOPIC_LAYOUT_PANEL:
+        # The panel has its own command topics, queue and entity allowlist
+        subscriptions.append(
+            await dispatcher.async_add_panel(
+                entry.data[CONF_PANEL_ID],
+                entry.options.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE),
+                entry.options.get(CONF_QUEUE_WORKERS, DEFAULT_QUEUE_WORKERS),
+                entry.options.get(CONF_QUEUE_RATE, DEFAULT_QUEUE_RATE),
+                entry.options.get(CONF_QUEUE_OVERFLOW, DEFAULT_QUEUE_OVERFLOW),
             )
+        )
+    else:
+        # Entries on the shared layout share one command subscription
+        await dispatcher.async_acquire()
+        subscriptions.append(dispatcher.async_release)
 
-    @callback
-    def handle_light_brightness(msg: mqtt.ReceiveMessage) -> None:
-        """Handle light brightness commands."""
-        topic_parts = msg.topic.split("/")
-        entity_name = topic_parts[4]
-        entity_id = f"light.{entity_name}"
-
-        try:
-            brightness = int(msg.payload)
-            _LOGGER.debug("Light brightness command: %s -> %d", entity_id, brightness)
-            hass.async_create_task(
-                hass.services.async_call(
-                    "light", "turn_on", {"entity_id": entity_id, "brightness": brightness}
-                )
-            )
-        except ValueError:
-            _LOGGER.warning("Invalid brightness value: %s", msg.payload)
+    await _async_update_dispatcher(hass, dispatcher)
+    _LOGGER.info("NSPanel Pro MQTT bridge initialized with base topic: %s", MQTT_BASE_TOPIC)
 
-    # Cover handlers
-    @callback
-    def handle_cover_set(msg: mqtt.ReceiveMessage) -> None:
-        """Handle cover open/close/stop commands."""
-        topic_parts = msg.topic.split("/")
-        entity_name = topic_parts[4]
-        entity_id = f"cover.{entity_name}"
-        payload = msg.payload.lower()
-
-        _LOGGER.debug("Cover set command: %s -> %s", entity_id, payload)
-
-        action_map = {
-            "open": "open_cover",
-            "close": "close_cover",
-            "stop": "stop_cover",
-        }
-
-        if payload in action_map:
-            hass.async_create_task(
-                hass.services.async_call("cover", action_map[payload], {"entity_id": entity_id})
-            )
 
-    @callback
-    def handle_cover_position(msg: mqtt.ReceiveMessage) -> None:
-        """Handle cover position commands."""
-        topic_parts = msg.topic.split("/")
-        entity_name = topic_parts[4]
-        entity_id = f"cover.{entity_name}"
-
-        try:
-            position = int(msg.payload)
-            _LOGGER.debug("Cover position command: %s -> %d", entity_id, position)
-            hass.async_create_task(
-                hass.services.async_call(
-                    "cover", "set_cover_position", {"entity_id": entity_id, "position": position}
-                )
-            )
-        except ValueError:
-            _LOGGER.warning("Invalid position value: %s", msg.payload)
+async def _async_setup_panel_config(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply the configuration published for the panel."""
+    panel_id = entry.data[CONF_PANEL_ID]
+    data = hass.data[DOMAIN][entry.entry_id]
+    state_push: StatePushEngine = data["state_push"]
+    dispatcher: CommandDispatcher = hass.data[DOMAIN]["dispatcher"]
 
-    # Climate handlers
     @callback
-    def handle_climate_mode(msg: mqtt.ReceiveMessage) -> None:
-        """Handle climate mode commands."""
-        topic_parts = msg.topic.split("/")
-        entity_name = topic_parts[4]
-        entity_id = f"climate.{entity_name}"
-        hvac_mode = msg.payload.lower()
-
-        _LOGGER.debug("Climate mode command: %s -> %s", entity_id, hvac_mode)
-        hass.async_create_task(
-            hass.services.async_call(
-                "climate", "set_hvac_mode", {"entity_id": entity_id, "hvac_mode": hvac_mode}
-            )
-        )
-
-    @callback
-    def handle_climate_preset(msg: mqtt.ReceiveMessage) -> None:
-        """Handle climate preset commands."""
-        topic_parts = msg.topic.split("/")
-        entity_name = topic_parts[4]
-        entity_id = f"climate.{entity_name}"
-        preset_mode = msg.payload
-
-        _LOGGER.debug("Climate preset command: %s -> %s", entity_id, preset_mode)
-        hass.async_create_task(
-            hass.services.async_call(
-                "climate", "set_preset_mode", {"entity_id": entity_id, "preset_mode": preset_mode}
-            )
-        )
-
-    @callback
-    def handle_climate_temperature(msg: mqtt.ReceiveMessage) -> None:
-        """Handle climate temperature commands."""
-        topic_parts = msg.topic.split("/")
-        entity_name = topic_parts[4]
-        entity_id = f"climate.{entity_name}"
-
-        try:
-            temperature = float(msg.payload)
-            _LOGGER.debug("Climate temperature command: %s -> %f", entity_id, temperature)
-            hass.async_create_task(
-                hass.services.async_call(
-                    "climate", "set_temperature", {"entity_id": entity_id, "temperature": temperature}
-                )
-            )
-        except ValueError:
-            _LOGGER.warning("Invalid temperature value: %s", msg.payload)
-
-    # Subscribe to all command topics
-    subscriptions.append(
-        await mqtt.async_subscribe(hass, MQTT_CMD_LIGHT_SET, handle_light_set)
-    )
-    subscriptions.append(
-        await mqtt.async_subscribe(hass, MQTT_CMD_LIGHT_BRIGHTNESS, handle_light_brightness)
+    def _async_config_received(config: dict[str, Any]) -> None:
+        """Handle a new panel configuration."""
+        entity_ids = entity_ids_from_config(config)
+        groups = groups_from_config(config)
+        state_push.async_set_entities(entity_ids)
+        dispatcher.async_set_groups(panel_id, groups)
+        dispatcher.async_set_allowed(panel_id, entity_ids.union(*groups.values()))
+
+    data["subscriptions"].append(
+        await async_subscribe_panel_config(hass, panel_id, _async_config_received)
     )
-    subscriptions.append(
-        await mqtt.async_subscribe(hass, MQTT_CMD_COVER_SET, handle_cover_set)
+    data["subscriptions"].append(lambda: dispatcher.async_set_groups(panel_id, {}))
+
+
+def _topic_layout(entry: ConfigEntry) -> str:
+    """Return the command topic layout of an entry."""
+    return entry.options.get(CONF_TOPIC_LAYOUT, DEFAULT_TOPIC_LAYOUT)
+
+
+async def _async_update_dispatcher(
+    hass: HomeAssistant, dispatcher: CommandDispatcher
+) -> None:
+    """Apply the options of the loaded entries to the shared dispatcher.
+
+    Limits are shared by all panels, so the most conservative value wins;
+    the shared queue only follows the entries on the shared topic layout
+    and takes the overflow policy from the first of them. Commands are
+    journaled while any entry enables the journal.
+    """
+    entries = [
+        entry
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.entry_id in hass.data[DOMAIN]
+    ]
+    await _async_update_journal(
+        hass,
+        dispatcher,
+        any(
+            entry.options.get(CONF_COMMAND_JOURNAL, DEFAULT_COMMAND_JOURNAL)
+            for entry in entries
+        ),
     )
-    subscriptions.append(
-        await mqtt.async_subscribe(hass, MQTT_CMD_COVER_POSITION, handle_cover_position)
-    )
-    subscriptions.append(
-        await mqtt.async_subscribe(hass, MQTT_CMD_CLIMATE_MODE, handle_climate_mode)
+    if not entries:
+        return
+
+    options = [entry.options for entry in entries]
+    dispatcher.coalescer.rate = min(
+        opts.get(CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE) for opts in options
     )
-    subscriptions.append(
-        await mqtt.async_subscribe(hass, MQTT_CMD_CLIMATE_PRESET, handle_climate_preset)
+    dispatcher.async_set_batch_window(
+        min(opts.get(CONF_BATCH_WINDOW, DEFAULT_BATCH_WINDOW) for opts in options)
+        / 1000
     )
-    subscriptions.append(
-        await mqtt.async_subscribe(hass, MQTT_CMD_CLIMATE_TEMPERATURE, handle_climate_temperature)
+
+    options = [
+        entry.options
+        for entry in entries
+        if _topic_layout(entry) != TOPIC_LAYOUT_PANEL
+    ]
+    if not options:
+        return
+
+    dispatcher.shared.queue.async_configure(
+        min(opts.get(CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE) for opts in options),
+        min(opts.get(CONF_QUEUE_WORKERS, DEFAULT_QUEUE_WORKERS) for opts in options),
+        min(opts.get(CONF_QUEUE_RATE, DEFAULT_QUEUE_RATE) for opts in options),
+        options[0].get(CONF_QUEUE_OVERFLOW, DEFAULT_QUEUE_OVERFLOW),
     )
 
-    hass.data[DOMAIN][entry.entry_id]["subscriptions"] = subscriptions
-    _LOGGER.info("NSPanel Pro MQTT bridge initialized with base topic: %s", MQTT_BASE_TOPIC)
+
+async def _async_update_journal(
+    hass: HomeAssistant, dispatcher: CommandDispatcher, enabled: bool
+) -> None:
+    """Start or stop journaling the received commands.
+
+    A stopped journal is closed before this returns, so a journal started
+    right after it does not open the same file while it is still written.
+    """
+    if (journal := dispatcher.journal) is None:
+        if enabled:
+            journal = CommandJournal(hass, hass.config.path(JOURNAL_FILE))
+            journal.async_start()
+            dispatcher.async_set_journal(journal)
+            _LOGGER.info("Recording panel commands to %s", journal.path)
+    elif not enabled:
+        dispatcher.async_set_journal(None)
+        await journal.async_close()
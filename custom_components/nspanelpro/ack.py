@@ -0,0 +1,174 @@
+"""Acknowledgements of panel commands."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+import json
+import logging
+from typing import Any
+
+from homeassistant.components import mqtt
+from homeassistant.core import HomeAssistant, callback
+
+from .const import ACK_TIMEOUT, MQTT_ACK_TOPIC
+
+_LOGGER = logging.getLogger(__name__)
+
+# Ack statuses
+ACK_ACCEPTED = "accepted"
+ACK_OK = "ok"
+ACK_ERROR = "error"
+ACK_REJECTED = "rejected"
+ACK_EXPIRED = "timeout"
+
+
+class CommandAck:
+    """A command the panel expects acknowledgements for."""
+
+    __slots__ = ("id", "topic", "remaining", "error", "keys", "timer", "done")
+
+    def __init__(self, command_id: str, topic: str) -> None:
+        """Initialize the ack."""
+        self.id = command_id
+        self.topic = topic
+        # Service calls of the command that have not completed yet
+        self.remaining = 0
+        self.error: str | None = None
+        self.keys: list[tuple[str, str]] = []
+        self.timer: asyncio.TimerHandle | None = None
+        self.done = False
+
+
+class AckTracker:
+    """Follow commands carrying a correlation id to their service calls.
+
+    A command is accepted once its value was validated, echoing the value
+    that will be applied so the panel may show it optimistically. Every
+    service call the command leads to is expected for its entities and
+    service; when a call of the queue starts, it takes the acks expected
+    for it, so a slider value coalesced into a later one is confirmed by
+    that later call. Once all calls of a command completed, the result
+    (``ok`` or ``error``) is published; commands whose calls never run, for
+    example because the queue overflowed, time out.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        # Ack of the command whose handler is running
+        self.current: CommandAck | None = None
+        self._pending: dict[tuple[str, str], list[CommandAck]] = {}
+
+    @property
+    def pending(self) -> int:
+        """Return the number of service calls awaited by commands."""
+        return sum(len(acks) for acks in self._pending.values())
+
+    @callback
+    def async_create(self, command_id: str, panel_id: str) -> CommandAck:
+        """Return the ack of a received command."""
+        return CommandAck(command_id, MQTT_ACK_TOPIC.format(panel_id=panel_id))
+
+    @callback
+    def async_accept(
+        self,
+        ack: CommandAck,
+        entity_ids: Iterable[str],
+        value: Any,
+        skipped: Iterable[str] = (),
+    ) -> None:
+        """Acknowledge a command that passed the checks of its scope.
+
+        ``skipped`` are the group members the command leaves out.
+        """
+        ack.timer = self.hass.loop.call_later(ACK_TIMEOUT, self._async_expire, ack)
+        fields: dict[str, Any] = {"entity_id": list(entity_ids), "value": value}
+        if skipped:
+            fields["skipped"] = list(skipped)
+        self._async_publish(ack, ACK_ACCEPTED, **fields)
+
+    @callback
+    def async_reject(self, ack: CommandAck, reason: str) -> None:
+        """Report that a command will not be executed."""
+        self._async_finish(ack)
+        self._async_publish(ack, ACK_REJECTED, error=reason)
+
+    @callback
+    def async_expect(self, target: str | tuple[str, ...], service: str) -> None:
+        """Expect a service call for the command being handled."""
+        if (ack := self.current) is None:
+            return
+
+        for entity_id in (target,) if isinstance(target, str) else target:
+            key = (entity_id, service)
+            self._pending.setdefault(key, []).append(ack)
+            ack.keys.append(key)
+            ack.remaining += 1
+
+    @callback
+    def async_take(self, entity_ids: Iterable[str], service: str) -> list[CommandAck]:
+        """Return the acks confirmed by a service call that is starting."""
+        if not self._pending:
+            return []
+
+        acks: list[CommandAck] = []
+        for entity_id in entity_ids:
+            acks.extend(self._pending.pop((entity_id, service), ()))
+        return acks
+
+    @callback
+    def async_resolve(self, acks: list[CommandAck], error: str | None = None) -> None:
+        """Record the result of a service call for the acks it took."""
+        for ack in acks:
+            if ack.done:
+                continue
+            ack.remaining -= 1
+            if error is not None:
+                ack.error = error
+            if ack.remaining > 0:
+                continue
+            self._async_finish(ack)
+            if ack.error is None:
+                self._async_publish(ack, ACK_OK)
+            else:
+                self._async_publish(ack, ACK_ERROR, error=ack.error)
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop all pending acks without publishing."""
+        for acks in self._pending.values():
+            for ack in acks:
+                self._async_finish(ack)
+        self._pending.clear()
+
+    @callback
+    def _async_expire(self, ack: CommandAck) -> None:
+        """Report a command whose service calls did not run in time."""
+        ack.timer = None
+        self._async_finish(ack)
+        for key in ack.keys:
+            if (acks := self._pending.get(key)) is not None and ack in acks:
+                acks.remove(ack)
+                if not acks:
+                    del self._pending[key]
+        self._async_publish(ack, ACK_EXPIRED)
+
+    @callback
+    def _async_finish(self, ack: CommandAck) -> None:
+        """Mark an ack as done."""
+        ack.done = True
+        if ack.timer is not None:
+            ack.timer.cancel()
+            ack.timer = None
+
+    @callback
+    def _async_publish(self, ack: CommandAck, status: str, **fields: Any) -> None:
+        """Publish an acknowledgement."""
+        _LOGGER.debug("Command %s: %s", ack.id, status)
+        self.hass.async_create_task(
+            mqtt.async_publish(
+                self.hass,
+                ack.topic,
+                json.dumps({"id": ack.id, "status": status, **fields}),
+            )
+        )
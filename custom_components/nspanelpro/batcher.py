@@ -0,0 +1,104 @@
+"""Merging of per-entity panel commands into multi-entity service calls."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+ServiceSender = Callable[[str, str, dict[str, Any]], None]
+
+
+class CommandBatcher:
+    """Collect identical service calls for different entities.
+
+    Calls that only differ in their target entities and arrive within the
+    collection window are sent as one service call with an entity list, so
+    an "all lights off" button costs one service call instead of twenty.
+    A call for an entity that is already collected with another service or
+    data sends the collected calls first, so an entity's calls keep their
+    order.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, window: float, send: ServiceSender
+    ) -> None:
+        """Initialize the batcher with a window in seconds."""
+        self.hass = hass
+        self.window = window
+        self._send = send
+        self._batches: dict[
+            tuple, tuple[dict[str, Any], dict[str, None], asyncio.TimerHandle]
+        ] = {}
+        # Batch key of every collected entity
+        self._entities: dict[str, tuple] = {}
+
+    @property
+    def pending(self) -> int:
+        """Return the number of collected service calls."""
+        return len(self._batches)
+
+    @callback
+    def async_submit(self, domain: str, service: str, data: dict[str, Any]) -> None:
+        """Submit a service call, merging it with calls in the same window."""
+        if self.window <= 0:
+            self._send(domain, service, data)
+            return
+
+        target = data["entity_id"]
+        entity_ids = (target,) if isinstance(target, str) else target
+        key = (
+            domain,
+            service,
+            tuple(sorted((k, v) for k, v in data.items() if k != "entity_id")),
+        )
+        if any(
+            self._entities.get(entity_id, key) != key for entity_id in entity_ids
+        ):
+            # Batches are sent in the order they were started
+            self._async_flush_all()
+
+        if (batch := self._batches.get(key)) is None:
+            batch = self._batches[key] = (
+                data,
+                {},
+                self.hass.loop.call_later(self.window, self._async_flush, key),
+            )
+
+        # dict keeps the arrival order and drops duplicates
+        batch[1].update(dict.fromkeys(entity_ids))
+        for entity_id in entity_ids:
+            self._entities[entity_id] = key
+
+    @callback
+    def _async_flush(self, key: tuple) -> None:
+        """Send a collected service call."""
+        if (batch := self._batches.pop(key, None)) is None:
+            return
+
+        data, entity_ids, timer = batch
+        timer.cancel()
+        for entity_id in entity_ids:
+            del self._entities[entity_id]
+
+        domain, service, _ = key
+        if len(entity_ids) == 1:
+            # A lone command keeps its single entity target
+            self._send(domain, service, {**data, "entity_id": next(iter(entity_ids))})
+        else:
+            self._send(domain, service, {**data, "entity_id": list(entity_ids)})
+
+    @callback
+    def _async_flush_all(self) -> None:
+        """Send every collected service call."""
+        for key in list(self._batches):
+            self._async_flush(key)
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop collected service calls."""
+        for _, _, timer in self._batches.values():
+            timer.cancel()
+        self._batches.clear()
+        self._entities.clear()
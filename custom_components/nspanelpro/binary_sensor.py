@@ -0,0 +1,54 @@
+"""Binary sensors for NSPanel Pro integration."""
+from __future__ import annotations
+
+from homeassistant.components.binary_sensor import (
+    BinarySensorDeviceClass,
+    BinarySensorEntity,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DOMAIN
+from .entity import NSPanelProEntity
+from .presence import PanelPresence
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up NSPanel Pro binary sensors from a config entry."""
+    presence: PanelPresence = hass.data[DOMAIN][entry.entry_id]["presence"]
+    async_add_entities([NSPanelProConnectivitySensor(entry, presence)])
+
+
+class NSPanelProConnectivitySensor(NSPanelProEntity, BinarySensorEntity):
+    """Whether the panel is connected to the broker."""
+
+    _attr_device_class = BinarySensorDeviceClass.CONNECTIVITY
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_translation_key = "connected"
+
+    def __init__(self, entry: ConfigEntry, presence: PanelPresence) -> None:
+        """Initialize the binary sensor."""
+        super().__init__(entry, "connected")
+        self._presence = presence
+
+    async def async_added_to_hass(self) -> None:
+        """Follow presence changes of the panel."""
+        self.async_on_remove(
+            self._presence.async_add_listener(self._async_presence_changed)
+        )
+
+    @property
+    def is_on(self) -> bool | None:
+        """Return whether the panel is connected, None until it is heard from."""
+        return self._presence.online
+
+    @callback
+    def _async_presence_changed(self, online: bool) -> None:
+        """Write the new state."""
+        self.async_write_ha_state()
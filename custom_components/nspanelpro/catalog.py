@@ -0,0 +1,283 @@
+"""Indexed catalog of the entities a panel can show."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterable
+from dataclasses import asdict, dataclass
+import logging
+from typing import Any
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    EventStateChangedData,
+    HomeAssistant,
+    State,
+    callback,
+)
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+
+from .const import CATALOG_DOMAINS, CATALOG_PAGE_SIZE, CATALOG_UPDATE_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogEntry:
+    """What the config card shows of an entity."""
+
+    entity_id: str
+    domain: str
+    name: str
+    state: str
+    area_id: str | None
+
+
+CatalogListener = Callable[[list[dict[str, Any]], list[str]], None]
+
+
+class _Subscription:
+    """Changes collected for one catalog subscriber."""
+
+    __slots__ = ("domains", "listener", "stopped", "changed", "removed", "timer")
+
+    def __init__(
+        self,
+        domains: frozenset[str],
+        listener: CatalogListener,
+        stopped: CALLBACK_TYPE | None,
+    ) -> None:
+        """Initialize the subscription."""
+        self.domains = domains
+        self.listener = listener
+        self.stopped = stopped
+        self.changed: dict[str, CatalogEntry] = {}
+        self.removed: set[str] = set()
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class EntityCatalog:
+    """Keep the eligible entities indexed by domain.
+
+    The index is built once from the state machine and then kept current
+    from state changes and registry updates of eligible entities only.
+    Subscribers receive the entries that changed in what the card shows
+    (name, state or area), collected for a short delay, instead of every
+    state change in the house.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the catalog."""
+        self.hass = hass
+        self._index: dict[str, dict[str, CatalogEntry]] = {
+            domain: {} for domain in CATALOG_DOMAINS
+        }
+        self._subscriptions: set[_Subscription] = set()
+        self._unsubs: list[CALLBACK_TYPE] = []
+
+    @callback
+    def async_start(self) -> None:
+        """Build the index and start following changes."""
+        entity_registry = er.async_get(self.hass)
+        device_registry = dr.async_get(self.hass)
+        for state in self.hass.states.async_all(CATALOG_DOMAINS):
+            self._index[state.domain][state.entity_id] = self._async_entry(
+                state, entity_registry, device_registry
+            )
+
+        self._unsubs = [
+            self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                self._async_state_changed,
+                event_filter=self._async_is_eligible,
+            ),
+            self.hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_entity_registry_updated
+            ),
+            self.hass.bus.async_listen(
+                dr.EVENT_DEVICE_REGISTRY_UPDATED, self._async_device_registry_updated
+            ),
+        ]
+        _LOGGER.debug(
+            "Indexed %d entities",
+            sum(len(entries) for entries in self._index.values()),
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop following changes and drop the index and subscribers.
+
+        Subscribers are told the catalog stopped, so they can subscribe to
+        the one built next.
+        """
+        while self._unsubs:
+            self._unsubs.pop()()
+        subscriptions = list(self._subscriptions)
+        self._subscriptions.clear()
+        for subscription in subscriptions:
+            if subscription.timer is not None:
+                subscription.timer.cancel()
+            if subscription.stopped is not None:
+                subscription.stopped()
+        for entries in self._index.values():
+            entries.clear()
+
+    @callback
+    def async_query(
+        self,
+        domains: Iterable[str] | None = None,
+        area_id: str | None = None,
+        search: str | None = None,
+        offset: int = 0,
+        limit: int = CATALOG_PAGE_SIZE,
+    ) -> dict[str, Any]:
+        """Return a page of matching entries sorted by domain and name."""
+        needle = search.casefold() if search else None
+        matches = [
+            entry
+            for domain in domains or CATALOG_DOMAINS
+            for entry in self._index.get(domain, {}).values()
+            if (area_id is None or entry.area_id == area_id)
+            and (
+                needle is None
+                or needle in entry.name.casefold()
+                or needle in entry.entity_id
+            )
+        ]
+        matches.sort(key=lambda entry: (entry.domain, entry.name.casefold()))
+        return {
+            "entities": [asdict(entry) for entry in matches[offset : offset + limit]],
+            "total": len(matches),
+            "offset": offset,
+        }
+
+    @callback
+    def async_subscribe(
+        self,
+        domains: Iterable[str] | None,
+        listener: CatalogListener,
+        stopped: CALLBACK_TYPE | None = None,
+    ) -> CALLBACK_TYPE:
+        """Subscribe to changed and removed entries of some domains.
+
+        ``stopped`` is called if the catalog stops while subscribed.
+        """
+        subscription = _Subscription(
+            frozenset(domains or CATALOG_DOMAINS), listener, stopped
+        )
+        self._subscriptions.add(subscription)
+
+        @callback
+        def _async_unsubscribe() -> None:
+            if subscription.timer is not None:
+                subscription.timer.cancel()
+            # Already gone if the catalog stopped
+            self._subscriptions.discard(subscription)
+
+        return _async_unsubscribe
+
+    @callback
+    def _async_entry(
+        self,
+        state: State,
+        entity_registry: er.EntityRegistry,
+        device_registry: dr.DeviceRegistry,
+    ) -> CatalogEntry:
+        """Build the catalog entry of a state."""
+        area_id = None
+        if (registry_entry := entity_registry.async_get(state.entity_id)) is not None:
+            area_id = registry_entry.area_id
+            if area_id is None and registry_entry.device_id is not None:
+                device = device_registry.async_get(registry_entry.device_id)
+                area_id = device.area_id if device is not None else None
+        return CatalogEntry(
+            state.entity_id, state.domain, state.name, state.state, area_id
+        )
+
+    @callback
+    def _async_is_eligible(self, event_data: EventStateChangedData) -> bool:
+        """Return whether a state change is for an eligible domain."""
+        state = event_data["new_state"] or event_data["old_state"]
+        return state is not None and state.domain in self._index
+
+    @callback
+    def _async_state_changed(self, event: Event[EventStateChangedData]) -> None:
+        """Update the entry of an entity whose state changed."""
+        self._async_refresh(event.data["entity_id"], event.data["new_state"])
+
+    @callback
+    def _async_entity_registry_updated(
+        self, event: Event[er.EventEntityRegistryUpdatedData]
+    ) -> None:
+        """Update the area of an entity, or drop its old id when renamed."""
+        if event.data["action"] != "update":
+            return
+        entity_id = event.data["entity_id"]
+        if entity_id.partition(".")[0] not in self._index:
+            return
+        if (old_entity_id := event.data.get("old_entity_id")) is not None:
+            self._async_refresh(old_entity_id, None)
+        self._async_refresh(entity_id, self.hass.states.get(entity_id))
+
+    @callback
+    def _async_device_registry_updated(
+        self, event: Event[dr.EventDeviceRegistryUpdatedData]
+    ) -> None:
+        """Update the area of the entities of a device."""
+        if event.data["action"] != "update" or "area_id" not in event.data["changes"]:
+            return
+        for registry_entry in er.async_entries_for_device(
+            er.async_get(self.hass), event.data["device_id"]
+        ):
+            if registry_entry.domain in self._index:
+                self._async_refresh(
+                    registry_entry.entity_id,
+                    self.hass.states.get(registry_entry.entity_id),
+                )
+
+    @callback
+    def _async_refresh(self, entity_id: str, state: State | None) -> None:
+        """Update an entry and notify subscribers if what they show changed."""
+        entries = self._index[entity_id.partition(".")[0]]
+        old = entries.get(entity_id)
+        if state is None:
+            if old is not None:
+                del entries[entity_id]
+                self._async_notify(old, removed=True)
+            return
+
+        new = self._async_entry(
+            state, er.async_get(self.hass), dr.async_get(self.hass)
+        )
+        if new == old:
+            return
+        entries[entity_id] = new
+        self._async_notify(new, removed=False)
+
+    @callback
+    def _async_notify(self, entry: CatalogEntry, removed: bool) -> None:
+        """Queue a change for the subscribers of the entry's domain."""
+        for subscription in self._subscriptions:
+            if entry.domain not in subscription.domains:
+                continue
+            if removed:
+                subscription.changed.pop(entry.entity_id, None)
+                subscription.removed.add(entry.entity_id)
+            else:
+                subscription.removed.discard(entry.entity_id)
+                subscription.changed[entry.entity_id] = entry
+            if subscription.timer is None:
+                subscription.timer = self.hass.loop.call_later(
+                    CATALOG_UPDATE_DELAY, self._async_flush, subscription
+                )
+
+    @callback
+    def _async_flush(self, subscription: _Subscription) -> None:
+        """Send the collected changes to a subscriber."""
+        subscription.timer = None
+        changed = [asdict(entry) for entry in subscription.changed.values()]
+        removed = sorted(subscription.removed)
+        subscription.changed.clear()
+        subscription.removed.clear()
+        subscription.listener(changed, removed)
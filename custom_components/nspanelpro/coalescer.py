@@ -0,0 +1,99 @@
+"""Coalescing of high-rate slider commands for NSPanel Pro panels."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+
+@dataclass(slots=True)
+class _Slot:
+    """Dispatch state of one entity attribute within its interval."""
+
+    timer: asyncio.TimerHandle
+    pending: tuple[Any, Callable[[Any], None]] | None = None
+
+
+class CommandCoalescer:
+    """Rate limit slider commands per entity and attribute.
+
+    The first value of a burst is sent immediately (leading edge). Values
+    arriving within the interval replace each other and only the latest one
+    is sent when the interval expires (trailing edge), so the target always
+    ends up at the last value the user picked. An entity attribute only has
+    a slot while its interval runs, idle ones are dropped when it expires.
+    """
+
+    def __init__(self, hass: HomeAssistant, rate: float) -> None:
+        """Initialize the coalescer with a maximum rate in Hz."""
+        self.hass = hass
+        self.interval = 1 / rate
+        self.dropped = 0
+        self._slots: dict[tuple[str, str], _Slot] = {}
+
+    @property
+    def rate(self) -> float:
+        """Return the maximum dispatch rate in Hz."""
+        return 1 / self.interval
+
+    @rate.setter
+    def rate(self, rate: float) -> None:
+        """Set the maximum dispatch rate in Hz."""
+        self.interval = 1 / rate
+
+    @property
+    def pending(self) -> int:
+        """Return the number of values waiting for the interval to expire."""
+        return sum(slot.pending is not None for slot in self._slots.values())
+
+    @callback
+    def async_submit(
+        self,
+        entity_id: str,
+        attribute: str,
+        value: Any,
+        send: Callable[[Any], None],
+    ) -> bool:
+        """Submit a value, sending it now or when the interval expires.
+
+        Returns whether the value replaced one that was not sent yet.
+        """
+        key = (entity_id, attribute)
+        if (slot := self._slots.get(key)) is None:
+            self._slots[key] = _Slot(self._async_start_interval(key))
+            send(value)
+            return False
+
+        replaced = slot.pending is not None
+        if replaced:
+            self.dropped += 1
+        slot.pending = (value, send)
+        return replaced
+
+    @callback
+    def _async_start_interval(self, key: tuple[str, str]) -> asyncio.TimerHandle:
+        """Wait for the interval to expire after a value was sent."""
+        return self.hass.loop.call_later(self.interval, self._async_flush, key)
+
+    @callback
+    def _async_flush(self, key: tuple[str, str]) -> None:
+        """Send the latest pending value, or drop the slot if there is none."""
+        slot = self._slots[key]
+        if slot.pending is None:
+            del self._slots[key]
+            return
+
+        value, send = slot.pending
+        slot.pending = None
+        slot.timer = self._async_start_interval(key)
+        send(value)
+
+    @callback
+    def async_cancel(self) -> None:
+        """Cancel pending values and timers."""
+        for slot in self._slots.values():
+            slot.timer.cancel()
+        self._slots.clear()
@@ -0,0 +1,150 @@
+"""Bounded, rate limited command queue for NSPanel Pro panels."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Callable, Coroutine, Hashable
+import logging
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+from .const import OVERFLOW_COALESCE, OVERFLOW_DROP_NEWEST
+
+_LOGGER = logging.getLogger(__name__)
+
+CommandJob = Callable[[], Coroutine[Any, Any, Any]]
+
+
+class CommandQueue:
+    """Run panel commands with bounded concurrency and a token bucket.
+
+    Commands wait in a bounded queue. At most ``concurrency`` commands run
+    at once, and no more than ``rate`` per second start on average, with
+    bursts of up to ``rate`` commands. When the queue is full the overflow
+    policy decides which command is dropped:
+
+    - drop_oldest: the oldest queued command
+    - drop_newest: the incoming command
+    - coalesce: a queued command with the same key is replaced by the
+      incoming one, otherwise the oldest queued command is dropped
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        name: str,
+        max_size: int,
+        concurrency: int,
+        rate: float,
+        policy: str,
+    ) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self.name = name
+        self.dropped = 0
+        self._pending: deque[tuple[Hashable, CommandJob]] = deque()
+        self._active = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self.async_configure(max_size, concurrency, rate, policy)
+        self._tokens = self._burst
+        self._refilled = hass.loop.time()
+
+    @property
+    def depth(self) -> int:
+        """Return the number of queued commands."""
+        return len(self._pending)
+
+    @property
+    def active(self) -> int:
+        """Return the number of running commands."""
+        return self._active
+
+    @callback
+    def async_configure(
+        self, max_size: int, concurrency: int, rate: float, policy: str
+    ) -> None:
+        """Apply new limits."""
+        self.max_size = max(int(max_size), 1)
+        self.concurrency = max(int(concurrency), 1)
+        self.rate = float(rate)
+        self.policy = policy
+        self._burst = max(self.rate, 1.0)
+
+    @callback
+    def async_submit(self, key: Hashable, job: CommandJob) -> None:
+        """Queue a command, applying the overflow policy when full."""
+        pending = self._pending
+        if len(pending) >= self.max_size:
+            self.dropped += 1
+            if self.policy == OVERFLOW_DROP_NEWEST:
+                _LOGGER.debug("Command queue %s full, dropping %s", self.name, key)
+                return
+
+            if self.policy == OVERFLOW_COALESCE:
+                for index, (queued_key, _) in enumerate(pending):
+                    if queued_key == key:
+                        pending[index] = (key, job)
+                        return
+
+            dropped_key, _ = pending.popleft()
+            _LOGGER.debug("Command queue %s full, dropping %s", self.name, dropped_key)
+
+        pending.append((key, job))
+        self._async_pump()
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop queued commands; running commands are left to finish."""
+        self._pending.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    @callback
+    def _async_pump(self) -> None:
+        """Start queued commands while concurrency and tokens allow."""
+        while self._pending and self._active < self.concurrency:
+            if self._timer is not None:
+                # Waiting for the next token
+                return
+
+            if (wait := self._async_take_token()) > 0:
+                self._timer = self.hass.loop.call_later(wait, self._async_refill)
+                return
+
+            _, job = self._pending.popleft()
+            self._active += 1
+            self.hass.async_create_task(self._async_run(job))
+
+    @callback
+    def _async_refill(self) -> None:
+        """Resume after waiting for a token."""
+        self._timer = None
+        self._async_pump()
+
+    @callback
+    def _async_take_token(self) -> float:
+        """Take a token, or return the seconds until one is available."""
+        now = self.hass.loop.time()
+        self._tokens = min(
+            self._burst, self._tokens + (now - self._refilled) * self.rate
+        )
+        self._refilled = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    async def _async_run(self, job: CommandJob) -> None:
+        """Run a command and start the next one when it is done."""
+        try:
+            await job()
+        except (HomeAssistantError, vol.Invalid) as err:
+            _LOGGER.warning("Panel command failed: %s", err)
+        finally:
+            self._active -= 1
+            self._async_pump()
@@ -0,0 +1,191 @@
+"""Declarative table of the commands a panel can send."""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+import math
+from typing import Any
+
+from homeassistant.core import State
+
+from .const import MQTT_BASE_TOPIC
+
+
+@dataclass(frozen=True, slots=True)
+class CommandSpec:
+    """How the payload of a command topic becomes a service call.
+
+    A command either maps keyword payloads to services (``actions``), or
+    calls ``service`` with the parsed payload as ``attribute``. Parsed values
+    are clamped to ``minimum``/``maximum`` and to the range the target
+    entities report in ``range_attributes``, then multiplied by ``scale``;
+    values missing from the list an entity reports in ``options_attribute``
+    are rejected.
+    """
+
+    domain: str
+    action: str
+    service: str | None = None
+    attribute: str | None = None
+    actions: Mapping[str, str] | None = None
+    parser: Callable[[str], Any] = str
+    minimum: float | None = None
+    maximum: float | None = None
+    range_attributes: tuple[str, str] | None = None
+    options_attribute: str | None = None
+    scale: float = 1
+    # Slider commands are rate limited per entity by the coalescer
+    coalesce: bool = False
+
+    @property
+    def pattern(self) -> str:
+        """Return the MQTT command pattern of the command."""
+        return f"{MQTT_BASE_TOPIC}/cmd/{self.domain}/+/{self.action}"
+
+    @property
+    def needs_state(self) -> bool:
+        """Return whether parsing depends on the state of the entities."""
+        return self.range_attributes is not None or self.options_attribute is not None
+
+
+def _finite_float(payload: str) -> float:
+    """Parse a float, rejecting nan and infinity."""
+    if not math.isfinite(value := float(payload)):
+        raise ValueError(f"{payload} is not a number")
+    return value
+
+
+_ON_OFF = {"on": "turn_on", "off": "turn_off", "toggle": "toggle"}
+
+COMMANDS: tuple[CommandSpec, ...] = (
+    CommandSpec("light", "set", actions=_ON_OFF),
+    CommandSpec(
+        "light",
+        "brightness",
+        service="turn_on",
+        attribute="brightness",
+        parser=int,
+        minimum=0,
+        maximum=255,
+        coalesce=True,
+    ),
+    CommandSpec(
+        "cover",
+        "set",
+        actions={"open": "open_cover", "close": "close_cover", "stop": "stop_cover"},
+    ),
+    CommandSpec(
+        "cover",
+        "position",
+        service="set_cover_position",
+        attribute="position",
+        parser=int,
+        minimum=0,
+        maximum=100,
+        coalesce=True,
+    ),
+    CommandSpec(
+        "climate",
+        "mode",
+        service="set_hvac_mode",
+        attribute="hvac_mode",
+        parser=str.lower,
+        options_attribute="hvac_modes",
+    ),
+    CommandSpec(
+        "climate",
+        "preset",
+        service="set_preset_mode",
+        attribute="preset_mode",
+        options_attribute="preset_modes",
+    ),
+    CommandSpec(
+        "climate",
+        "temperature",
+        service="set_temperature",
+        attribute="temperature",
+        parser=_finite_float,
+        range_attributes=("min_temp", "max_temp"),
+        coalesce=True,
+    ),
+    CommandSpec("switch", "set", actions=_ON_OFF),
+    CommandSpec("fan", "set", actions=_ON_OFF),
+    CommandSpec(
+        "fan",
+        "percentage",
+        service="set_percentage",
+        attribute="percentage",
+        parser=int,
+        minimum=0,
+        maximum=100,
+        coalesce=True,
+    ),
+    CommandSpec("scene", "activate", service="turn_on"),
+    CommandSpec("script", "run", service="turn_on"),
+    CommandSpec(
+        "media_player",
+        "volume",
+        service="volume_set",
+        attribute="volume_level",
+        parser=_finite_float,
+        minimum=0,
+        maximum=100,
+        scale=0.01,
+        coalesce=True,
+    ),
+    CommandSpec(
+        "lock",
+        "set",
+        actions={"lock": "lock", "unlock": "unlock", "open": "open"},
+    ),
+)
+
+# Routing table: (domain, action) -> command
+COMMAND_SPECS: dict[tuple[str, str], CommandSpec] = {
+    (spec.domain, spec.action): spec for spec in COMMANDS
+}
+COMMAND_PATTERNS = [spec.pattern for spec in COMMANDS]
+
+
+def parse_command(
+    spec: CommandSpec, payload: str, states: Iterable[State] = ()
+) -> tuple[str, Any, Any]:
+    """Return the service and the validated values of a command payload.
+
+    The values are the one passed to the service and the clamped one in the
+    units of the panel, before scaling. ``states`` are the states of the
+    target entities, needed by commands that validate against entity
+    attributes. Both values are None for commands without one. Raises
+    ValueError for payloads the command does not accept.
+    """
+    if spec.actions is not None:
+        if (service := spec.actions.get(payload.lower())) is None:
+            raise ValueError(f"unknown action {payload}")
+        return service, None, None
+
+    if spec.attribute is None:
+        return spec.service, None, None
+
+    value = spec.parser(payload)
+    minimum, maximum = spec.minimum, spec.maximum
+    for state in states:
+        if spec.range_attributes is not None:
+            # A group is limited to the range all of its entities accept
+            low, high = (state.attributes.get(key) for key in spec.range_attributes)
+            if low is not None:
+                minimum = low if minimum is None else max(minimum, low)
+            if high is not None:
+                maximum = high if maximum is None else min(maximum, high)
+        if spec.options_attribute is not None:
+            options = state.attributes.get(spec.options_attribute)
+            if options is not None and value not in options:
+                raise ValueError(f"{value} is not supported by {state.entity_id}")
+
+    if minimum is not None and value < minimum:
+        value = minimum
+    if maximum is not None and value > maximum:
+        value = maximum
+    if spec.scale != 1:
+        return spec.service, value * spec.scale, value
+
+    return spec.service, value, value
@@ -11,7 +11,37 @@ from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import selector
 
-from .const import DOMAIN, CONF_PANEL_ID, CONF_PANEL_NAME, DEFAULT_PANEL_NAME
+from .const import (
+    DOMAIN,
+    CONF_BATCH_WINDOW,
+    CONF_COMMAND_JOURNAL,
+    CONF_COMMAND_RATE,
+    CONF_DELTA_UPDATES,
+    CONF_PANEL_ID,
+    CONF_PANEL_NAME,
+    CONF_PAYLOAD_ENCODING,
+    CONF_QUEUE_OVERFLOW,
+    CONF_QUEUE_RATE,
+    CONF_QUEUE_SIZE,
+    CONF_QUEUE_WORKERS,
+    CONF_SNAPSHOT_MAX_BYTES,
+    CONF_TOPIC_LAYOUT,
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_COMMAND_JOURNAL,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_DELTA_UPDATES,
+    DEFAULT_PANEL_NAME,
+    DEFAULT_PAYLOAD_ENCODING,
+    DEFAULT_QUEUE_OVERFLOW,
+    DEFAULT_QUEUE_RATE,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_QUEUE_WORKERS,
+    DEFAULT_SNAPSHOT_MAX_BYTES,
+    DEFAULT_TOPIC_LAYOUT,
+    OVERFLOW_POLICIES,
+    PAYLOAD_ENCODINGS,
+    TOPIC_LAYOUTS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -99,6 +129,133 @@ class NSPanelProOptionsFlow(config_entries.OptionsFlow):
                             type=selector.TextSelectorType.TEXT,
                         )
                     ),
+                    vol.Required(
+                        CONF_COMMAND_RATE,
+                        default=self.config_entry.options.get(
+                            CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=1,
+                            max=50,
+                            step=1,
+                            unit_of_measurement="Hz",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_SNAPSHOT_MAX_BYTES,
+                        default=self.config_entry.options.get(
+                            CONF_SNAPSHOT_MAX_BYTES, DEFAULT_SNAPSHOT_MAX_BYTES
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=256,
+                            max=262144,
+                            step=1,
+                            unit_of_measurement="bytes",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_PAYLOAD_ENCODING,
+                        default=self.config_entry.options.get(
+                            CONF_PAYLOAD_ENCODING, DEFAULT_PAYLOAD_ENCODING
+                        ),
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=PAYLOAD_ENCODINGS,
+                            translation_key=CONF_PAYLOAD_ENCODING,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_DELTA_UPDATES,
+                        default=self.config_entry.options.get(
+                            CONF_DELTA_UPDATES, DEFAULT_DELTA_UPDATES
+                        ),
+                    ): selector.BooleanSelector(),
+                    vol.Required(
+                        CONF_QUEUE_SIZE,
+                        default=self.config_entry.options.get(
+                            CONF_QUEUE_SIZE, DEFAULT_QUEUE_SIZE
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=1,
+                            max=10000,
+                            step=1,
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_QUEUE_WORKERS,
+                        default=self.config_entry.options.get(
+                            CONF_QUEUE_WORKERS, DEFAULT_QUEUE_WORKERS
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=1,
+                            max=32,
+                            step=1,
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_QUEUE_RATE,
+                        default=self.config_entry.options.get(
+                            CONF_QUEUE_RATE, DEFAULT_QUEUE_RATE
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=1,
+                            max=1000,
+                            step=1,
+                            unit_of_measurement="commands/s",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_QUEUE_OVERFLOW,
+                        default=self.config_entry.options.get(
+                            CONF_QUEUE_OVERFLOW, DEFAULT_QUEUE_OVERFLOW
+                        ),
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=OVERFLOW_POLICIES,
+                            translation_key=CONF_QUEUE_OVERFLOW,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_BATCH_WINDOW,
+                        default=self.config_entry.options.get(
+                            CONF_BATCH_WINDOW, DEFAULT_BATCH_WINDOW
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=100,
+                            step=1,
+                            unit_of_measurement="ms",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_TOPIC_LAYOUT,
+                        default=self.config_entry.options.get(
+                            CONF_TOPIC_LAYOUT, DEFAULT_TOPIC_LAYOUT
+                        ),
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=TOPIC_LAYOUTS,
+                            translation_key=CONF_TOPIC_LAYOUT,
+                        )
+                    ),
+                    vol.Required(
+                        CONF_COMMAND_JOURNAL,
+                        default=self.config_entry.options.get(
+                            CONF_COMMAND_JOURNAL, DEFAULT_COMMAND_JOURNAL
+                        ),
+                    ): selector.BooleanSelector(),
                 }
             ),
         )
@@ -0,0 +1,177 @@
+"""Versioned, persisted panel configurations for NSPanel Pro panels."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import Any
+
+from homeassistant.components import mqtt
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.json import json_dumps
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    MQTT_CONFIG_DIFF_TOPIC,
+    MQTT_CONFIG_TOPIC,
+    STORAGE_KEY,
+    STORAGE_VERSION,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Keys that change on every publish without changing the configuration
+_VOLATILE_KEYS = frozenset({"timestamp", "version", "hash"})
+
+# Save at most this often, a card may reconfigure several panels at once
+_SAVE_DELAY = 5  # seconds
+
+
+def config_hash(config: dict[str, Any]) -> str:
+    """Return a content hash of a panel configuration."""
+    content = {k: v for k, v in config.items() if k not in _VOLATILE_KEYS}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode(), usedforsecurity=False).hexdigest()
+
+
+def _entity_lists(config: dict[str, Any]) -> dict[str, list[str]]:
+    """Return the entity ids per category, skipping malformed entries."""
+    entities = config.get("entities")
+    if not isinstance(entities, dict):
+        return {}
+
+    return {
+        category: [e for e in selected if isinstance(e, str)]
+        for category, selected in entities.items()
+        if isinstance(category, str) and isinstance(selected, list)
+    }
+
+
+def config_diff(old: dict[str, Any], new: dict[str, Any]) -> dict[str, Any]:
+    """Return the entities added and removed and the other changed keys.
+
+    Changed keys hold their new value, or None when they were removed.
+    """
+    old_entities = _entity_lists(old)
+    new_entities = _entity_lists(new)
+    added: dict[str, list[str]] = {}
+    removed: dict[str, list[str]] = {}
+    for category in new_entities.keys() | old_entities.keys():
+        old_ids = old_entities.get(category, [])
+        new_ids = new_entities.get(category, [])
+        old_set = set(old_ids)
+        new_set = set(new_ids)
+        if ids := [e for e in new_ids if e not in old_set]:
+            added[category] = ids
+        if ids := [e for e in old_ids if e not in new_set]:
+            removed[category] = ids
+
+    changed = {
+        key: new.get(key)
+        for key in new.keys() | old.keys()
+        if key != "entities"
+        and key not in _VOLATILE_KEYS
+        and new.get(key) != old.get(key)
+    }
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+class PanelConfigStore:
+    """Publish panel configurations only when their content changed.
+
+    Every panel has a version that grows with each new configuration. The
+    full configuration is published retained with its version and hash; a
+    diff against the previous version is published on the diff topic so a
+    panel can patch its layout instead of redrawing everything. Versions
+    and configurations are kept in ``.storage`` and survive restarts; a
+    configuration is only stored once it was published.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self.hass = hass
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY
+        )
+        self._panels: dict[str, dict[str, Any]] = {}
+        # Versions are assigned one publish at a time
+        self._lock = asyncio.Lock()
+
+    async def async_load(self) -> None:
+        """Load the persisted configurations."""
+        self._panels = await self._store.async_load() or {}
+
+    def version(self, panel_id: str) -> int:
+        """Return the current configuration version of a panel."""
+        return self._panels.get(panel_id, {}).get("version", 0)
+
+    async def async_publish(
+        self, panel_id: str, config: dict[str, Any], force: bool = False
+    ) -> bool:
+        """Publish a configuration unless the panel already has it.
+
+        With force, an unchanged configuration is published again with its
+        current version, e.g. after the broker lost the retained message.
+        Returns whether anything was published.
+        """
+        async with self._lock:
+            return await self._async_publish(panel_id, config, force)
+
+    async def _async_publish(
+        self, panel_id: str, config: dict[str, Any], force: bool
+    ) -> bool:
+        """Publish a configuration and store it once it was published."""
+        digest = config_hash(config)
+        current = self._panels.get(panel_id)
+        if current is not None and current["hash"] == digest:
+            if not force:
+                _LOGGER.debug("Configuration of panel %s is unchanged", panel_id)
+                return False
+            await self._async_publish_config(
+                panel_id, config, current["version"], digest
+            )
+            _LOGGER.debug(
+                "Republished configuration version %d to panel %s",
+                current["version"],
+                panel_id,
+            )
+            return True
+
+        version = self.version(panel_id) + 1
+        content = {k: v for k, v in config.items() if k not in _VOLATILE_KEYS}
+        await self._async_publish_config(panel_id, config, version, digest)
+        if current is not None:
+            await mqtt.async_publish(
+                self.hass,
+                MQTT_CONFIG_DIFF_TOPIC.format(panel_id=panel_id),
+                json_dumps(
+                    {
+                        "version": version,
+                        "base": current["version"],
+                        **config_diff(current["config"], content),
+                    }
+                ),
+            )
+
+        self._panels[panel_id] = {
+            "version": version,
+            "hash": digest,
+            "config": content,
+        }
+        self._store.async_delay_save(lambda: self._panels, _SAVE_DELAY)
+        _LOGGER.debug(
+            "Published configuration version %d to panel %s", version, panel_id
+        )
+        return True
+
+    async def _async_publish_config(
+        self, panel_id: str, config: dict[str, Any], version: int, digest: str
+    ) -> None:
+        """Publish the retained configuration of a panel."""
+        await mqtt.async_publish(
+            self.hass,
+            MQTT_CONFIG_TOPIC.format(panel_id=panel_id),
+            json_dumps({**config, "version": version, "hash": digest}),
+            retain=True,
+        )
@@ -5,22 +5,130 @@ DOMAIN = "nspanelpro"
 # MQTT Topics
 MQTT_BASE_TOPIC = "domodreams/nspanelpro"
 
-# Command topics (Panel → HA)
-MQTT_CMD_LIGHT_SET = f"{MQTT_BASE_TOPIC}/cmd/light/+/set"
-MQTT_CMD_LIGHT_BRIGHTNESS = f"{MQTT_BASE_TOPIC}/cmd/light/+/brightness"
-MQTT_CMD_COVER_SET = f"{MQTT_BASE_TOPIC}/cmd/cover/+/set"
-MQTT_CMD_COVER_POSITION = f"{MQTT_BASE_TOPIC}/cmd/cover/+/position"
-MQTT_CMD_CLIMATE_MODE = f"{MQTT_BASE_TOPIC}/cmd/climate/+/mode"
-MQTT_CMD_CLIMATE_PRESET = f"{MQTT_BASE_TOPIC}/cmd/climate/+/preset"
-MQTT_CMD_CLIMATE_TEMPERATURE = f"{MQTT_BASE_TOPIC}/cmd/climate/+/temperature"
+# Command topics (Panel → HA), cmd/{domain}/{entity}/{action}; the commands
+# are listed in commands.py
+MQTT_CMD_TOPIC = f"{MQTT_BASE_TOPIC}/cmd/#"
+# Command topics of a panel using the panel topic layout
+MQTT_PANEL_CMD_TOPIC = f"{MQTT_BASE_TOPIC}/{{panel_id}}/cmd/#"
+# Entity segment of group commands: cmd/{domain}/_group/{action}
+GROUP_SEGMENT = "_group"
 
 # State topics (HA → Panel)
 MQTT_STATE_TOPIC = f"{MQTT_BASE_TOPIC}/state"
 
+MQTT_SNAPSHOT_TOPIC = f"{MQTT_BASE_TOPIC}/snapshot/{{panel_id}}"
+
+# Resync request topic (Panel → HA)
+MQTT_RESYNC_TOPIC = f"{MQTT_BASE_TOPIC}/resync/{{panel_id}}"
+
+# Config topics (Card → Panel)
+MQTT_CONFIG_TOPIC = f"{MQTT_BASE_TOPIC}/config/{{panel_id}}"
+MQTT_CONFIG_DIFF_TOPIC = f"{MQTT_BASE_TOPIC}/config/{{panel_id}}/diff"
+
+# Command acknowledgements (HA → Panel)
+MQTT_ACK_TOPIC = f"{MQTT_BASE_TOPIC}/ack/{{panel_id}}"
+
+# Status topics (Panel → HA, birth and last will messages)
+MQTT_STATUS_TOPIC = f"{MQTT_BASE_TOPIC}/status/{{panel_id}}"
+PANEL_ONLINE = "online"
+PANEL_OFFLINE = "offline"
+# Periodic heartbeat of panels that publish one (Panel → HA, any payload)
+MQTT_HEARTBEAT_TOPIC = f"{MQTT_BASE_TOPIC}/heartbeat/{{panel_id}}"
+
 # Config keys
 CONF_PANELS = "panels"
 CONF_PANEL_ID = "panel_id"
 CONF_PANEL_NAME = "panel_name"
+CONF_COMMAND_RATE = "command_rate"
+CONF_SNAPSHOT_MAX_BYTES = "snapshot_max_bytes"
+CONF_PAYLOAD_ENCODING = "payload_encoding"
+CONF_DELTA_UPDATES = "delta_updates"
+CONF_QUEUE_SIZE = "queue_size"
+CONF_QUEUE_WORKERS = "queue_workers"
+CONF_QUEUE_RATE = "queue_rate"
+CONF_QUEUE_OVERFLOW = "queue_overflow"
+CONF_BATCH_WINDOW = "batch_window"
+CONF_TOPIC_LAYOUT = "topic_layout"
+CONF_COMMAND_JOURNAL = "command_journal"
+
+# Command topic layouts
+TOPIC_LAYOUT_SHARED = "shared"  # cmd/{domain}/{entity}/{action}
+TOPIC_LAYOUT_PANEL = "panel"  # {panel_id}/cmd/{domain}/{entity}/{action}
+TOPIC_LAYOUTS = [TOPIC_LAYOUT_SHARED, TOPIC_LAYOUT_PANEL]
+
+# Command queue overflow policies
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_COALESCE = "coalesce"
+OVERFLOW_POLICIES = [OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_COALESCE]
+
+# State payload encodings
+ENCODING_JSON = "json"
+ENCODING_COMPACT_JSON = "compact_json"
+ENCODING_MSGPACK = "msgpack"
+ENCODING_CBOR = "cbor"
+PAYLOAD_ENCODINGS = [ENCODING_JSON, ENCODING_COMPACT_JSON, ENCODING_MSGPACK, ENCODING_CBOR]
 
 # Defaults
 DEFAULT_PANEL_NAME = "NSPanel Pro"
+DEFAULT_COMMAND_RATE = 10  # Hz, per entity and slider attribute
+DEFAULT_SNAPSHOT_MAX_BYTES = 4096
+DEFAULT_PAYLOAD_ENCODING = ENCODING_JSON
+DEFAULT_DELTA_UPDATES = False
+DEFAULT_QUEUE_SIZE = 100
+DEFAULT_QUEUE_WORKERS = 4
+DEFAULT_QUEUE_RATE = 20  # commands per second
+DEFAULT_QUEUE_OVERFLOW = OVERFLOW_COALESCE
+DEFAULT_BATCH_WINDOW = 5  # milliseconds, 0 disables batching
+DEFAULT_TOPIC_LAYOUT = TOPIC_LAYOUT_SHARED
+DEFAULT_COMMAND_JOURNAL = False
+
+# Commands with a correlation id not executed within this time are reported
+ACK_TIMEOUT = 10  # seconds
+
+# A panel that publishes heartbeats is offline when none arrived for this long
+HEARTBEAT_TIMEOUT = 90  # seconds
+
+# Latest commands of each topic namespace included in the diagnostics
+COMMAND_LOG_SIZE = 50
+
+# Delayed state publishes of all panels share a timer wheel of this resolution
+TIMER_WHEEL_RESOLUTION = 0.1  # seconds
+
+# Entities per panel whose last sent payload is kept for delta updates
+DELTA_CACHE_SIZE = 512
+
+# Latency samples kept per histogram, and how long a command may take to
+# change the state of its entity before it is no longer attributed to it
+LATENCY_WINDOW = 256
+LATENCY_MAX_AGE = 30  # seconds
+
+# Journal of received commands in the configuration directory, rotated to
+# .1, .2 and .3 when full; buffered commands are written once per interval
+JOURNAL_FILE = f"{DOMAIN}_journal.bin"
+JOURNAL_MAX_BYTES = 10 * 1024 * 1024
+JOURNAL_BACKUPS = 3
+JOURNAL_FLUSH_INTERVAL = 1  # seconds
+JOURNAL_BUFFER_BYTES = 64 * 1024
+# Oldest commands are dropped beyond this while writes are failing or stalled
+JOURNAL_BUFFER_MAX_BYTES = 1024 * 1024
+
+# Persisted panel configurations
+STORAGE_KEY = f"{DOMAIN}.panel_configs"
+STORAGE_VERSION = 1
+
+# Domains listed in the entity catalog of the config card
+CATALOG_DOMAINS = (
+    "light",
+    "cover",
+    "climate",
+    "switch",
+    "fan",
+    "scene",
+    "script",
+    "media_player",
+    "lock",
+)
+CATALOG_PAGE_SIZE = 100
+# Changes are collected for this long before they are sent to the card
+CATALOG_UPDATE_DELAY = 0.5  # seconds
@@ -0,0 +1,81 @@
+"""Diagnostics support for NSPanel Pro integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .const import CONF_PANEL_ID, DOMAIN
+from .dispatcher import CommandDispatcher
+from .stats import async_get_stats
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    dispatcher: CommandDispatcher = hass.data[DOMAIN]["dispatcher"]
+    data = hass.data[DOMAIN][entry.entry_id]
+    scope = dispatcher.async_get_scope(entry.data[CONF_PANEL_ID])
+    queue = scope.queue
+    stats = async_get_stats(hass)
+
+    return {
+        "entry": {
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        },
+        "queue": {
+            "name": queue.name,
+            "depth": queue.depth,
+            "active": queue.active,
+            "dropped": queue.dropped,
+        },
+        # Work accepted from the panel that has not run yet
+        "pending": {
+            "batched_calls": scope.batcher.pending,
+            "coalesced_values": dispatcher.coalescer.pending,
+            "awaited_acks": scope.acks.pending,
+        },
+        "setup_time_ms": round(data["setup_time"] * 1000, 1),
+        "presence": {
+            "online": data["presence"].online,
+            "suppressed_updates": data["state_push"].suppressed,
+        },
+        "throttled_updates": data["state_push"].throttle.throttled,
+        "journal": {
+            "path": dispatcher.journal.path,
+            "records": dispatcher.journal.records,
+            "dropped": dispatcher.journal.dropped,
+        }
+        if dispatcher.journal is not None
+        else None,
+        "coalesced_commands": scope.coalesced,
+        "rejected_commands": scope.rejected,
+        "skipped_targets": scope.skipped,
+        "commands": {
+            "received": {
+                f"{domain}/{action}": count
+                for (domain, action), count in sorted(scope.received.items())
+            },
+            "log": [
+                {
+                    "time": dt_util.utc_from_timestamp(received).isoformat(),
+                    "topic": topic,
+                    "payload": payload,
+                    "result": result,
+                }
+                for received, topic, payload, result in scope.log
+            ],
+        },
+        # Messages and handler time of the subscriptions of all panels
+        "subscriptions": stats.async_diagnostics(),
+        "profile": {
+            "running": stats.profiling,
+            "last": stats.last_profile,
+        },
+        # Latency histograms of all panels; the panel scope is keyed by queue
+        "latency": dispatcher.latency.async_stats(),
+    }
@@ -0,0 +1,544 @@
+"""MQTT command dispatcher for NSPanel Pro panels."""
+from __future__ import annotations
+
+from collections import Counter, deque
+from functools import partial
+import json
+import logging
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import mqtt
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    HomeAssistant,
+    State,
+    callback,
+    valid_entity_id,
+)
+from homeassistant.exceptions import HomeAssistantError
+
+from .ack import AckTracker
+from .batcher import CommandBatcher
+from .coalescer import CommandCoalescer
+from .command_queue import CommandQueue
+from .commands import COMMAND_PATTERNS, COMMAND_SPECS, CommandSpec, parse_command
+from .const import (
+    COMMAND_LOG_SIZE,
+    DEFAULT_BATCH_WINDOW,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_QUEUE_OVERFLOW,
+    DEFAULT_QUEUE_RATE,
+    DEFAULT_QUEUE_SIZE,
+    DEFAULT_QUEUE_WORKERS,
+    MQTT_CMD_TOPIC,
+    MQTT_PANEL_CMD_TOPIC,
+)
+from .journal import CommandJournal
+from .latency import LatencyTracker
+from .router import TopicRouter
+from .stats import async_subscribe
+
+_LOGGER = logging.getLogger(__name__)
+
+# A single entity id, or the entity ids of a group command
+Target = str | tuple[str, ...]
+
+# What became of a command, as recorded in the command log; the reasons a
+# command is rejected are also reported in its acknowledgement
+RESULT_ACCEPTED = "accepted"
+RESULT_INVALID_TOPIC = "invalid topic"
+RESULT_INVALID_COMMAND = "invalid command"
+RESULT_NOT_ALLOWED = "not allowed"
+RESULT_UNKNOWN_ENTITY = "unknown entity"
+RESULT_INVALID_VALUE = "invalid value"
+
+
+@callback
+def _async_call(
+    scope: CommandScope, domain: str, service: str, data: dict
+) -> None:
+    """Schedule a service call for a panel command."""
+    scope.acks.async_expect(data["entity_id"], service)
+    scope.batcher.async_submit(domain, service, data)
+
+
+@callback
+def _async_call_coalesced(
+    scope: CommandScope,
+    domain: str,
+    service: str,
+    entity_id: Target,
+    attribute: str,
+    value: Any,
+) -> None:
+    """Schedule a slider service call through the coalescer."""
+    scope.acks.async_expect(entity_id, service)
+    if scope.coalescer.async_submit(
+        entity_id,
+        attribute,
+        value,
+        lambda latest: scope.batcher.async_submit(
+            domain, service, {"entity_id": entity_id, attribute: latest}
+        ),
+    ):
+        scope.coalesced += 1
+
+
+def _parse_command(payload: str) -> dict[str, Any] | None:
+    """Return a JSON command, or None if it is invalid."""
+    try:
+        command = json.loads(payload)
+    except ValueError:
+        command = None
+    if not isinstance(command, dict) or "value" not in command:
+        _LOGGER.warning("Invalid command: %s", payload)
+        return None
+    return command
+
+
+@callback
+def _async_parse_value(
+    hass: HomeAssistant, spec: CommandSpec, target: Target, payload: str
+) -> tuple[str, Any, Any] | None:
+    """Return the service and values of a command, None if it is invalid."""
+    states: list[State] = []
+    if spec.needs_state:
+        for entity_id in (target,) if isinstance(target, str) else target:
+            if (state := hass.states.get(entity_id)) is not None:
+                states.append(state)
+
+    try:
+        return parse_command(spec, payload, states)
+    except ValueError as err:
+        _LOGGER.warning(
+            "Invalid %s %s command for %s: %s", spec.domain, spec.action, target, err
+        )
+        return None
+
+
+@callback
+def _async_handle_command(
+    scope: CommandScope, spec: CommandSpec, target: Target, service: str, value: Any
+) -> None:
+    """Schedule the service call of a validated command."""
+    _LOGGER.debug(
+        "%s %s command: %s -> %s %s", spec.domain, spec.action, target, service, value
+    )
+    if spec.coalesce:
+        _async_call_coalesced(
+            scope, spec.domain, service, target, spec.attribute, value
+        )
+    elif spec.attribute is not None:
+        _async_call(
+            scope, spec.domain, service, {"entity_id": target, spec.attribute: value}
+        )
+    else:
+        _async_call(scope, spec.domain, service, {"entity_id": target})
+
+
+class CommandScope:
+    """Commands received on one topic namespace.
+
+    The shared namespace (``cmd/...``) carries commands of every panel that
+    uses the shared topic layout; a panel using the panel topic layout has
+    its own namespace (``{panel_id}/cmd/...``), queue and entity allowlist.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        name: str,
+        router: TopicRouter,
+        queue: CommandQueue,
+        coalescer: CommandCoalescer,
+        latency: LatencyTracker,
+        batch_window: float,
+    ) -> None:
+        """Initialize the scope."""
+        self.hass = hass
+        self.name = name
+        self.router = router
+        self.queue = queue
+        self.coalescer = coalescer
+        self.latency = latency
+        self.batcher = CommandBatcher(hass, batch_window, self._async_queue_call)
+        self.acks = AckTracker(hass)
+        self.groups: dict[str, list[str]] = {}
+        # Panel of the namespace, None for the shared namespace
+        self.panel_id: str | None = None
+        # Entities the panel may command, None allows every entity
+        self.allowed: frozenset[str] | None = None
+        # Commands rejected before a service call was built
+        self.rejected = 0
+        # Group members left out of commands as unknown or unavailable
+        self.skipped = 0
+        # Slider values replaced by a later value of the namespace
+        self.coalesced = 0
+        # Commands received per domain and action
+        self.received: Counter[tuple[str, str]] = Counter()
+        # (time, topic, payload, result) of the latest commands
+        self.log: deque[tuple[float, str, str, str]] = deque(
+            maxlen=COMMAND_LOG_SIZE
+        )
+        self.journal: CommandJournal | None = None
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop collected and queued commands."""
+        self.batcher.async_cancel()
+        self.queue.async_cancel()
+        self.acks.async_cancel()
+
+    @callback
+    def _async_queue_call(self, domain: str, service: str, data: dict) -> None:
+        """Queue a service call for execution."""
+        target = data["entity_id"]
+        if isinstance(target, str):
+            entity_ids: tuple[str, ...] = (target,)
+        else:
+            target = entity_ids = tuple(target)
+            data = {**data, "entity_id": list(target)}
+
+        self.queue.async_submit(
+            (target, service),
+            partial(self._async_run_call, domain, service, data, entity_ids),
+        )
+
+    async def _async_run_call(
+        self, domain: str, service: str, data: dict, entity_ids: tuple[str, ...]
+    ) -> None:
+        """Run a service call and record when it completed."""
+        # Commands received from now on are confirmed by the next call
+        acks = self.acks.async_take(entity_ids, service)
+        try:
+            await self.hass.services.async_call(
+                domain, service, data, blocking=True
+            )
+        except (HomeAssistantError, vol.Invalid) as err:
+            self.acks.async_resolve(acks, str(err))
+            raise
+        self.acks.async_resolve(acks)
+        self.latency.async_service_done(domain, entity_ids)
+
+    @callback
+    def _async_resolve_group(
+        self, domain: str, command: dict[str, Any]
+    ) -> tuple[str, ...] | None:
+        """Return the entity ids of a group command.
+
+        The command is ``{"entity_id": [...], "value": ...}`` or
+        ``{"group": "<name>", "value": ...}`` for a group of a panel config.
+        """
+        if "group" in command:
+            if (members := self.groups.get(command["group"])) is None:
+                _LOGGER.warning("Unknown group: %s", command["group"])
+                return None
+        elif not isinstance(members := command.get("entity_id"), list):
+            _LOGGER.warning("Invalid group command: %s", command)
+            return None
+
+        prefix = f"{domain}."
+        entity_ids: dict[str, None] = {}
+        for member in members:
+            if not isinstance(member, str):
+                continue
+            entity_id = member if "." in member else prefix + member
+            if entity_id.startswith(prefix) and valid_entity_id(entity_id):
+                entity_ids[entity_id] = None
+
+        if not entity_ids:
+            return None
+
+        return tuple(entity_ids)
+
+    @callback
+    def async_handle_message(self, msg: mqtt.ReceiveMessage) -> None:
+        """Dispatch a command and record it in the command log."""
+        if self.journal is not None:
+            self.journal.async_record(msg.topic, msg.payload)
+        result = self._async_dispatch(msg)
+        self.log.append((time.time(), msg.topic, msg.payload, result))
+
+    @callback
+    def _async_dispatch(self, msg: mqtt.ReceiveMessage) -> str:
+        """Dispatch a command to its handler and return what became of it.
+
+        Payloads are plain values, or JSON objects with the ``value`` and an
+        optional correlation ``id`` the panel wants acknowledgements for.
+        Group commands are always JSON objects.
+        """
+        if (route := self.router.parse(msg.topic)) is None:
+            _LOGGER.debug("Ignoring command on unexpected topic: %s", msg.topic)
+            return RESULT_INVALID_TOPIC
+
+        self.received[route.domain, route.action] += 1
+        command: dict[str, Any] | None = None
+        if route.entity_id is None or msg.payload.startswith("{"):
+            if (command := _parse_command(msg.payload)) is None:
+                return RESULT_INVALID_COMMAND
+            value = str(command["value"])
+        else:
+            value = msg.payload
+
+        target: Target
+        if route.entity_id is not None:
+            target = route.entity_id
+            entity_ids: tuple[str, ...] = (target,)
+        elif (group := self._async_resolve_group(route.domain, command)) is None:
+            return RESULT_INVALID_COMMAND
+        else:
+            target = entity_ids = group
+
+        ack = None
+        if command is not None and "id" in command:
+            ack = self.acks.async_create(
+                str(command["id"]),
+                self.panel_id or str(command.get("panel", self.name)),
+            )
+
+        # Checked before any service call is built
+        if self.allowed is not None and not self.allowed.issuperset(entity_ids):
+            _LOGGER.warning(
+                "Panel %s is not allowed to control %s",
+                self.name,
+                ", ".join(sorted(set(entity_ids) - self.allowed)),
+            )
+            self.rejected += 1
+            if ack is not None:
+                self.acks.async_reject(ack, RESULT_NOT_ALLOWED)
+            return RESULT_NOT_ALLOWED
+
+        # The state machine indexes the entities that exist by entity id
+        get_state = self.hass.states.get
+        available = tuple(
+            entity_id
+            for entity_id in entity_ids
+            if (state := get_state(entity_id)) is not None
+            and state.state != STATE_UNAVAILABLE
+        )
+        skipped: tuple[str, ...] = ()
+        if len(available) != len(entity_ids):
+            skipped = tuple(e for e in entity_ids if e not in available)
+            # Stale panel configs keep sending these, don't flood the log
+            _LOGGER.debug(
+                "Ignoring command for unknown or unavailable %s", ", ".join(skipped)
+            )
+            if not available:
+                self.rejected += 1
+                if ack is not None:
+                    self.acks.async_reject(ack, RESULT_UNKNOWN_ENTITY)
+                return RESULT_UNKNOWN_ENTITY
+            # A group command still reaches its available members
+            self.skipped += len(skipped)
+            target = entity_ids = available
+
+        spec = COMMAND_SPECS[route.domain, route.action]
+        if (parsed := _async_parse_value(self.hass, spec, target, value)) is None:
+            if ack is not None:
+                self.acks.async_reject(ack, RESULT_INVALID_VALUE)
+            return RESULT_INVALID_VALUE
+
+        service, service_value, panel_value = parsed
+        if ack is not None:
+            # Echo the clamped value, or the action keyword
+            self.acks.async_accept(
+                ack,
+                entity_ids,
+                value if panel_value is None else panel_value,
+                skipped,
+            )
+
+        self.latency.async_command_received(entity_ids, self.name)
+        self.acks.current = ack
+        try:
+            _async_handle_command(self, spec, target, service, service_value)
+        finally:
+            self.acks.current = None
+        return RESULT_ACCEPTED
+
+
+class CommandDispatcher:
+    """Route panel commands to the scope of their topic namespace.
+
+    Entries using the shared topic layout acquire the dispatcher on setup
+    and release it on unload; the ``cmd/#`` subscription exists while at
+    least one entry holds a reference, so each command is handled once
+    regardless of panel count. Entries using the panel topic layout add a
+    panel scope with a narrow ``{panel_id}/cmd/#`` subscription instead.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the dispatcher."""
+        self.hass = hass
+        self.coalescer = CommandCoalescer(hass, DEFAULT_COMMAND_RATE)
+        self.latency = LatencyTracker(hass)
+        self.batch_window = DEFAULT_BATCH_WINDOW / 1000
+        self.journal: CommandJournal | None = None
+        # Commands on the shared topic layout cannot be told apart by panel
+        self.shared = CommandScope(
+            hass,
+            "shared",
+            TopicRouter(COMMAND_PATTERNS),
+            CommandQueue(
+                hass,
+                "shared",
+                DEFAULT_QUEUE_SIZE,
+                DEFAULT_QUEUE_WORKERS,
+                DEFAULT_QUEUE_RATE,
+                DEFAULT_QUEUE_OVERFLOW,
+            ),
+            self.coalescer,
+            self.latency,
+            self.batch_window,
+        )
+        self._panels: dict[str, CommandScope] = {}
+        self._panel_groups: dict[str, dict[str, list[str]]] = {}
+        self._refs = 0
+        self._unsub: CALLBACK_TYPE | None = None
+
+    async def async_acquire(self) -> None:
+        """Add a reference, subscribing to shared commands on the first one."""
+        self._refs += 1
+        if self._refs > 1:
+            return
+
+        unsub = await async_subscribe(
+            self.hass, MQTT_CMD_TOPIC, self.shared.async_handle_message
+        )
+        if self._refs == 0:
+            # Released while the subscription was being set up
+            unsub()
+            return
+
+        self._unsub = unsub
+        self.latency.async_start()
+        _LOGGER.debug("Subscribed to panel commands on %s", MQTT_CMD_TOPIC)
+
+    @callback
+    def async_release(self) -> None:
+        """Drop a reference, unsubscribing when the last one is gone."""
+        self._refs -= 1
+        if self._refs > 0 or self._unsub is None:
+            return
+
+        self._unsub()
+        self._unsub = None
+        self.shared.async_cancel()
+        self._async_stop_if_idle()
+        _LOGGER.debug("Unsubscribed from panel commands")
+
+    async def async_add_panel(
+        self,
+        panel_id: str,
+        queue_size: int,
+        queue_workers: int,
+        queue_rate: float,
+        queue_overflow: str,
+    ) -> CALLBACK_TYPE:
+        """Handle the commands of a panel on its own topic namespace.
+
+        The panel may only command entities of its configuration until an
+        allowlist is set. Returns a callback removing the panel.
+        """
+        topic = MQTT_PANEL_CMD_TOPIC.format(panel_id=panel_id)
+        scope = CommandScope(
+            self.hass,
+            panel_id,
+            TopicRouter(COMMAND_PATTERNS, prefix=topic.removesuffix("#")),
+            CommandQueue(
+                self.hass,
+                panel_id,
+                queue_size,
+                queue_workers,
+                queue_rate,
+                queue_overflow,
+            ),
+            self.coalescer,
+            self.latency,
+            self.batch_window,
+        )
+        scope.panel_id = panel_id
+        scope.allowed = frozenset()
+        scope.journal = self.journal
+        scope.groups = self._panel_groups.get(panel_id, {})
+        self._panels[panel_id] = scope
+
+        unsub = await async_subscribe(
+            self.hass, topic, scope.async_handle_message
+        )
+        self.latency.async_start()
+        _LOGGER.debug("Subscribed to commands of panel %s on %s", panel_id, topic)
+
+        @callback
+        def _async_remove_panel() -> None:
+            """Unsubscribe and drop the commands of the panel."""
+            unsub()
+            scope.async_cancel()
+            self._panels.pop(panel_id, None)
+            self._async_stop_if_idle()
+
+        return _async_remove_panel
+
+    @callback
+    def _async_stop_if_idle(self) -> None:
+        """Stop shared helpers once no subscription is left."""
+        if self._unsub is None and not self._panels:
+            self.coalescer.async_cancel()
+            self.latency.async_stop()
+
+    @callback
+    def async_get_scope(self, panel_id: str | None = None) -> CommandScope:
+        """Return the scope handling the commands of a panel."""
+        return self._panels.get(panel_id, self.shared)
+
+    @callback
+    def async_get_queue(self, panel_id: str | None = None) -> CommandQueue:
+        """Return the queue running the commands of a panel."""
+        return self.async_get_scope(panel_id).queue
+
+    @callback
+    def async_set_batch_window(self, window: float) -> None:
+        """Set the command collection window in seconds of every scope."""
+        self.batch_window = window
+        self.shared.batcher.window = window
+        for scope in self._panels.values():
+            scope.batcher.window = window
+
+    @callback
+    def async_set_journal(self, journal: CommandJournal | None) -> None:
+        """Record the commands of every scope in a journal, or stop."""
+        self.journal = journal
+        self.shared.journal = journal
+        for scope in self._panels.values():
+            scope.journal = journal
+
+    @callback
+    def async_set_allowed(self, panel_id: str, entity_ids: set[str]) -> None:
+        """Set the entities a panel with its own namespace may command."""
+        if (scope := self._panels.get(panel_id)) is not None:
+            scope.allowed = frozenset(entity_ids)
+
+    @callback
+    def async_set_groups(self, panel_id: str, groups: dict[str, list[str]]) -> None:
+        """Set the named entity groups defined in the config of a panel.
+
+        A panel scope only knows the groups of its panel, the shared scope
+        knows the groups of all panels.
+        """
+        if groups:
+            self._panel_groups[panel_id] = groups
+        else:
+            self._panel_groups.pop(panel_id, None)
+
+        if (scope := self._panels.get(panel_id)) is not None:
+            scope.groups = groups
+
+        self.shared.groups = {
+            name: members
+            for panel_groups in self._panel_groups.values()
+            for name, members in panel_groups.items()
+        }
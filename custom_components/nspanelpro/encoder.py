@@ -0,0 +1,261 @@
+"""State payload encoding for NSPanel Pro panels."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+import logging
+from typing import Any
+
+from homeassistant.core import State
+from homeassistant.helpers.json import json_dumps, json_encoder_default
+
+from .const import (
+    ENCODING_CBOR,
+    ENCODING_COMPACT_JSON,
+    ENCODING_JSON,
+    ENCODING_MSGPACK,
+)
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - optional dependency
+    cbor2 = None
+
+_LOGGER = logging.getLogger(__name__)
+
+Payload = str | bytes
+
+
+@dataclass(frozen=True, slots=True)
+class Projection:
+    """Attributes of a domain sent to the panel.
+
+    ``update`` attributes are sent with every state, ``sync`` attributes
+    only with the first full payload of an entity.
+    """
+
+    update: tuple[str, ...]
+    sync: tuple[str, ...]
+
+
+PROJECTIONS: dict[str, Projection] = {
+    "light": Projection(
+        update=("brightness", "color_mode", "color_temp_kelvin", "hs_color"),
+        sync=(
+            "friendly_name",
+            "supported_color_modes",
+            "min_color_temp_kelvin",
+            "max_color_temp_kelvin",
+            "supported_features",
+        ),
+    ),
+    "cover": Projection(
+        update=("current_position", "current_tilt_position"),
+        sync=("friendly_name", "device_class", "supported_features"),
+    ),
+    "climate": Projection(
+        update=(
+            "current_temperature",
+            "temperature",
+            "target_temp_high",
+            "target_temp_low",
+            "hvac_action",
+            "preset_mode",
+        ),
+        sync=(
+            "friendly_name",
+            "hvac_modes",
+            "preset_modes",
+            "min_temp",
+            "max_temp",
+            "target_temp_step",
+            "supported_features",
+        ),
+    ),
+    "switch": Projection(update=(), sync=("friendly_name", "device_class")),
+    "fan": Projection(
+        update=("percentage", "preset_mode", "oscillating", "direction"),
+        sync=("friendly_name", "preset_modes", "percentage_step", "supported_features"),
+    ),
+    "scene": Projection(update=(), sync=("friendly_name",)),
+    "script": Projection(update=(), sync=("friendly_name",)),
+    "media_player": Projection(
+        update=(
+            "volume_level",
+            "is_volume_muted",
+            "media_title",
+            "media_artist",
+            "source",
+        ),
+        sync=("friendly_name", "source_list", "supported_features"),
+    ),
+    "lock": Projection(update=(), sync=("friendly_name", "supported_features")),
+}
+
+# Short keys used by the compact encodings
+ATTRIBUTE_KEYS: dict[str, str] = {
+    "brightness": "br",
+    "color_mode": "cm",
+    "color_temp_kelvin": "ct",
+    "hs_color": "hs",
+    "supported_color_modes": "scm",
+    "min_color_temp_kelvin": "ctmin",
+    "max_color_temp_kelvin": "ctmax",
+    "current_position": "pos",
+    "current_tilt_position": "tilt",
+    "device_class": "dc",
+    "current_temperature": "cur",
+    "temperature": "tgt",
+    "target_temp_high": "hi",
+    "target_temp_low": "lo",
+    "hvac_action": "act",
+    "preset_mode": "pm",
+    "hvac_modes": "hms",
+    "preset_modes": "pms",
+    "min_temp": "min",
+    "max_temp": "max",
+    "target_temp_step": "step",
+    "percentage": "pct",
+    "oscillating": "osc",
+    "direction": "dir",
+    "percentage_step": "pstep",
+    "volume_level": "vol",
+    "is_volume_muted": "mute",
+    "media_title": "title",
+    "media_artist": "artist",
+    "source": "src",
+    "source_list": "srcs",
+    "friendly_name": "n",
+    "supported_features": "sf",
+}
+
+
+def build_state_payload(state: State) -> dict[str, Any]:
+    """Build the full state payload sent to a panel for an entity."""
+    return {
+        "entity_id": state.entity_id,
+        "state": state.state,
+        "attributes": dict(state.attributes),
+        "last_updated": state.last_updated.isoformat(),
+    }
+
+
+def build_compact_payload(state: State, full: bool) -> dict[str, Any]:
+    """Build a compact state payload with the projected attributes only."""
+    attributes = state.attributes
+    if (projection := PROJECTIONS.get(state.domain)) is None:
+        projected = dict(attributes)
+    else:
+        names = projection.update + projection.sync if full else projection.update
+        projected = {
+            ATTRIBUTE_KEYS.get(name, name): attributes[name]
+            for name in names
+            if name in attributes
+        }
+
+    payload: dict[str, Any] = {
+        "s": state.state,
+        "a": projected,
+        "t": int(state.last_updated.timestamp()),
+    }
+    if full:
+        # Updates are published on the entity's own topic
+        payload["e"] = state.entity_id
+    return payload
+
+
+def _msgpack_dumps(obj: Any) -> bytes:
+    """Serialize to MessagePack."""
+    return msgpack.packb(obj, default=json_encoder_default, use_bin_type=True)
+
+
+def _cbor_dumps(obj: Any) -> bytes:
+    """Serialize to CBOR."""
+    return cbor2.dumps(
+        obj, default=lambda encoder, value: encoder.encode(json_encoder_default(value))
+    )
+
+
+class StateEncoder:
+    """Build and serialize state payloads in the configured encoding."""
+
+    def __init__(self, encoding: str = ENCODING_JSON) -> None:
+        """Initialize the encoder."""
+        if (encoding == ENCODING_MSGPACK and msgpack is None) or (
+            encoding == ENCODING_CBOR and cbor2 is None
+        ):
+            _LOGGER.warning(
+                "Payload encoding %s is not installed, using compact JSON", encoding
+            )
+            encoding = ENCODING_COMPACT_JSON
+
+        self.encoding = encoding
+        self.compact = encoding != ENCODING_JSON
+        self.attributes_key = "a" if self.compact else "attributes"
+        self.seq_key = "q" if self.compact else "seq"
+        # Moves with every state change, so it alone is not a change
+        self.time_key = "t" if self.compact else "last_updated"
+        self.dumps: Callable[[Any], Payload] = {
+            ENCODING_MSGPACK: _msgpack_dumps,
+            ENCODING_CBOR: _cbor_dumps,
+        }.get(encoding, json_dumps)
+
+    def build(self, state: State, full: bool = True) -> dict[str, Any]:
+        """Build the payload of a state."""
+        if self.compact:
+            return build_compact_payload(state, full)
+        return build_state_payload(state)
+
+    def encode(self, state: State, full: bool = True) -> Payload:
+        """Build and serialize the payload of a state."""
+        return self.dumps(self.build(state, full))
+
+    def unchanged(
+        self, previous: dict[str, Any] | None, current: dict[str, Any]
+    ) -> bool:
+        """Return whether a payload differs from the previous one in time only."""
+        if previous is None or previous.keys() != current.keys():
+            return False
+        time_key = self.time_key
+        return all(
+            value == previous[key]
+            for key, value in current.items()
+            if key != time_key
+        )
+
+    def diff(
+        self, previous: dict[str, Any], current: dict[str, Any]
+    ) -> dict[str, Any]:
+        """Return the fields of a payload that changed since the previous one.
+
+        Attributes that disappeared are reported with a None value. The time
+        is only sent along with other changes.
+        """
+        attributes_key, time_key = self.attributes_key, self.time_key
+        changes = {
+            key: value
+            for key, value in current.items()
+            if key not in (attributes_key, time_key) and previous.get(key) != value
+        }
+
+        old_attributes = previous.get(attributes_key, {})
+        new_attributes = current.get(attributes_key, {})
+        changed_attributes = {
+            key: value
+            for key, value in new_attributes.items()
+            if key not in old_attributes or old_attributes[key] != value
+        }
+        changed_attributes.update(
+            (key, None) for key in old_attributes if key not in new_attributes
+        )
+        if changed_attributes:
+            changes[attributes_key] = changed_attributes
+        if changes and time_key in current:
+            changes[time_key] = current[time_key]
+
+        return changes
@@ -0,0 +1,25 @@
+"""Base entity for NSPanel Pro integration."""
+from __future__ import annotations
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.entity import Entity
+
+from .const import CONF_PANEL_ID, DOMAIN
+
+
+class NSPanelProEntity(Entity):
+    """Base class for entities belonging to a panel."""
+
+    _attr_has_entity_name = True
+
+    def __init__(self, entry: ConfigEntry, key: str) -> None:
+        """Initialize the entity."""
+        panel_id = entry.data[CONF_PANEL_ID]
+        self._attr_unique_id = f"{panel_id}_{key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, panel_id)},
+            name=entry.title,
+            manufacturer="SONOFF",
+            model="NSPanel Pro",
+        )
@@ -0,0 +1,219 @@
+"""Journal of the commands received from NSPanel Pro panels."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Iterator
+import logging
+import os
+import struct
+from typing import BinaryIO
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+
+from .const import (
+    JOURNAL_BACKUPS,
+    JOURNAL_BUFFER_BYTES,
+    JOURNAL_BUFFER_MAX_BYTES,
+    JOURNAL_FLUSH_INTERVAL,
+    JOURNAL_MAX_BYTES,
+)
+from .timer_wheel import async_get_timer_wheel
+
+_LOGGER = logging.getLogger(__name__)
+
+# Start of every journal file, the last byte is the format version
+JOURNAL_MAGIC = b"NSPJ\x01"
+# Receive time on the monotonic clock, topic length and payload length
+_RECORD = struct.Struct("<dHI")
+
+
+class CommandJournal:
+    """Record panel commands to a rotating, append-only binary file.
+
+    Commands are packed into a buffer on the event loop and written by the
+    executor once per flush interval, or sooner when the buffer fills up,
+    so recording a command costs a few bytes copied. When the file would
+    exceed its maximum size it is renamed to ``.1``, older files move up
+    to ``.{backups}`` and the oldest one is deleted. While writes fail or
+    stall, the buffer keeps at most ``buffer_max_bytes`` of the newest
+    commands and counts the dropped ones.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        path: str,
+        max_bytes: int = JOURNAL_MAX_BYTES,
+        backups: int = JOURNAL_BACKUPS,
+        buffer_max_bytes: int = JOURNAL_BUFFER_MAX_BYTES,
+    ) -> None:
+        """Initialize the journal."""
+        self.hass = hass
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_max_bytes = buffer_max_bytes
+        self.records = 0
+        self.dropped = 0
+        # Packed records waiting to be written, oldest first
+        self._buffer: deque[bytes] = deque()
+        self._buffered = 0
+        self._failing = False
+        # Commands arriving once closing started, e.g. during shutdown, are
+        # not recorded, so the file is not opened again
+        self._closed = False
+        self._file: BinaryIO | None = None
+        self._writer: asyncio.Task | None = None
+        self._wheel = async_get_timer_wheel(hass)
+        self._flush_scheduled = False
+        self._unsub_stop: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Write the buffered commands when Home Assistant stops."""
+        self._unsub_stop = self.hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_handle_stop
+        )
+
+    async def _async_handle_stop(self, event: Event) -> None:
+        """Close the journal on shutdown."""
+        self._unsub_stop = None
+        await self.async_close()
+
+    @callback
+    def async_record(self, topic: str, payload: str | bytes) -> None:
+        """Append a received command to the journal."""
+        if self._closed:
+            return
+        topic_bytes = topic.encode()
+        if isinstance(payload, str):
+            payload = payload.encode()
+        record = b"".join(
+            (
+                _RECORD.pack(self.hass.loop.time(), len(topic_bytes), len(payload)),
+                topic_bytes,
+                payload,
+            )
+        )
+        self._buffer.append(record)
+        self._buffered += len(record)
+        self.records += 1
+        self._async_trim()
+
+        if self._buffered >= JOURNAL_BUFFER_BYTES:
+            self._async_flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._wheel.async_schedule(self, JOURNAL_FLUSH_INTERVAL, self._async_flush)
+
+    @callback
+    def _async_trim(self) -> None:
+        """Drop the oldest records beyond the buffer limit."""
+        buffer = self._buffer
+        while self._buffered > self.buffer_max_bytes and len(buffer) > 1:
+            self._buffered -= len(buffer.popleft())
+            self.dropped += 1
+
+    @callback
+    def _async_flush(self) -> None:
+        """Start writing the buffer unless a write is in progress."""
+        if self._flush_scheduled:
+            self._flush_scheduled = False
+            self._wheel.async_cancel(self)
+        if self._buffer and self._writer is None:
+            self._writer = self.hass.async_create_background_task(
+                self._async_write(), "nspanelpro command journal"
+            )
+
+    async def _async_write(self) -> None:
+        """Write buffered commands until the buffer is empty.
+
+        Records that could not be written stay buffered for the next flush.
+        """
+        buffer = self._buffer
+        try:
+            while buffer:
+                records = list(buffer)
+                buffer.clear()
+                self._buffered = 0
+                try:
+                    await self.hass.async_add_executor_job(
+                        self._write, b"".join(records)
+                    )
+                except OSError as err:
+                    buffer.extendleft(reversed(records))
+                    self._buffered += sum(map(len, records))
+                    self._async_trim()
+                    if not self._failing:
+                        self._failing = True
+                        _LOGGER.error(
+                            "Could not write command journal %s: %s", self.path, err
+                        )
+                    return
+                if self._failing:
+                    self._failing = False
+                    _LOGGER.info("Writing command journal %s again", self.path)
+        finally:
+            self._writer = None
+
+    async def async_close(self) -> None:
+        """Write the remaining commands and close the file."""
+        self._closed = True
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        self._async_flush()
+        if (writer := self._writer) is not None:
+            await writer
+        if self._file is not None:
+            await self.hass.async_add_executor_job(self._file.close)
+            self._file = None
+
+    def _write(self, data: bytes) -> None:
+        """Append records to the file, rotating it when full."""
+        if self._file is None:
+            self._file = open(self.path, "ab")
+        if self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+            file, self._file = self._file, None
+            file.close()
+            self._rotate()
+            self._file = open(self.path, "ab")
+
+        if self._file.tell() == 0:
+            self._file.write(JOURNAL_MAGIC)
+        self._file.write(data)
+        self._file.flush()
+
+    def _rotate(self) -> None:
+        """Shift the journal files, dropping the oldest one."""
+        if self.backups < 1:
+            os.remove(self.path)
+            return
+
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(source := f"{self.path}.{index}"):
+                os.replace(source, f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def read_journal(path: str) -> Iterator[tuple[float, str, str]]:
+    """Yield the receive time, topic and payload of each journal record.
+
+    A record cut short, for example by a power loss, ends the journal.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(JOURNAL_MAGIC)) != JOURNAL_MAGIC:
+            raise ValueError(f"{path} is not a command journal")
+
+        while len(header := file.read(_RECORD.size)) == _RECORD.size:
+            received, topic_length, payload_length = _RECORD.unpack(header)
+            body = file.read(topic_length + payload_length)
+            if len(body) < topic_length + payload_length:
+                return
+            yield (
+                received,
+                body[:topic_length].decode(),
+                body[topic_length:].decode(errors="replace"),
+            )
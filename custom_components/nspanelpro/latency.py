@@ -0,0 +1,163 @@
+"""Command latency instrumentation for NSPanel Pro panels."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterable
+import math
+from typing import Any
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import (
+    CALLBACK_TYPE,
+    Event,
+    EventStateChangedData,
+    HomeAssistant,
+    callback,
+)
+
+from .const import LATENCY_MAX_AGE, LATENCY_WINDOW
+
+# Command received until the service call completed
+STAGE_SERVICE = "service"
+# Command received until the state of the entity changed
+STAGE_STATE = "state"
+
+SCOPE_DOMAIN = "domain"
+SCOPE_PANEL = "panel"
+
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+
+class LatencyRing:
+    """Fixed-size ring buffer of the latest latency samples in seconds."""
+
+    __slots__ = ("_samples", "_index", "count")
+
+    def __init__(self, size: int) -> None:
+        """Initialize the buffer."""
+        self._samples = array("d", bytes(8 * size))
+        self._index = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        """Add a sample, overwriting the oldest one when full."""
+        self._samples[self._index] = value
+        self._index = (self._index + 1) % len(self._samples)
+        self.count += 1
+
+    def percentiles(self, quantiles: dict[str, float]) -> dict[str, float]:
+        """Return several percentiles of the buffered samples."""
+        samples = sorted(self._samples[: min(self.count, len(self._samples))])
+        if not samples:
+            return {}
+        # Nearest rank
+        return {
+            name: samples[max(math.ceil(quantile * len(samples)) - 1, 0)]
+            for name, quantile in quantiles.items()
+        }
+
+
+class LatencyTracker:
+    """Measure how long panel commands take to take effect.
+
+    Commands are timestamped on receipt per target entity. The time until
+    the service call completed and until the entity state changed is
+    recorded per domain and per panel in ring buffers, so the tracker can
+    stay enabled without growing.
+    """
+
+    def __init__(self, hass: HomeAssistant, window: int = LATENCY_WINDOW) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self.window = window
+        self._rings: dict[tuple[str, str, str], LatencyRing] = {}
+        # Entity id -> (receipt time, panel) of the last command, until its
+        # service call completed and until the entity state changed
+        self._inflight: dict[str, tuple[float, str]] = {}
+        self._awaiting_state: dict[str, tuple[float, str]] = {}
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Start listening for state changes of commanded entities."""
+        if self._unsub is None:
+            self._unsub = self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED,
+                self._async_state_changed,
+                event_filter=self._async_is_inflight,
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop listening and forget commands in flight."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self._inflight.clear()
+        self._awaiting_state.clear()
+
+    @callback
+    def async_command_received(self, entity_ids: Iterable[str], panel: str) -> None:
+        """Timestamp a command for its target entities."""
+        received = (self.hass.loop.time(), panel)
+        for entity_id in entity_ids:
+            self._inflight[entity_id] = self._awaiting_state[entity_id] = received
+
+    @callback
+    def async_service_done(self, domain: str, entity_ids: Iterable[str]) -> None:
+        """Record the completion of the service call of a command."""
+        now = self.hass.loop.time()
+        for entity_id in entity_ids:
+            if (inflight := self._inflight.pop(entity_id, None)) is not None:
+                received, panel = inflight
+                self._async_record(STAGE_SERVICE, domain, panel, now - received)
+
+    @callback
+    def _async_is_inflight(self, event_data: EventStateChangedData) -> bool:
+        """Return whether a state change is for a commanded entity."""
+        return event_data["entity_id"] in self._awaiting_state
+
+    @callback
+    def _async_state_changed(self, event: Event[EventStateChangedData]) -> None:
+        """Record the state change of a commanded entity."""
+        entity_id = event.data["entity_id"]
+        received, panel = self._awaiting_state.pop(entity_id)
+        latency = self.hass.loop.time() - received
+        if latency <= LATENCY_MAX_AGE:
+            domain = entity_id.partition(".")[0]
+            self._async_record(STAGE_STATE, domain, panel, latency)
+
+    @callback
+    def _async_record(
+        self, stage: str, domain: str, panel: str, latency: float
+    ) -> None:
+        """Add a sample to the domain and the panel histogram of a stage."""
+        for key in ((stage, SCOPE_DOMAIN, domain), (stage, SCOPE_PANEL, panel)):
+            if (ring := self._rings.get(key)) is None:
+                ring = self._rings[key] = LatencyRing(self.window)
+            ring.add(latency)
+
+    @callback
+    def async_percentile(
+        self, stage: str, scope: str, name: str, quantile: float
+    ) -> float | None:
+        """Return a latency percentile in milliseconds."""
+        if (ring := self._rings.get((stage, scope, name))) is None:
+            return None
+        if (latency := ring.percentiles({"value": quantile}).get("value")) is None:
+            return None
+        return round(latency * 1000, 1)
+
+    @callback
+    def async_stats(self) -> dict[str, Any]:
+        """Return sample counts and percentiles in milliseconds per histogram."""
+        stats: dict[str, Any] = {}
+        for (stage, scope, name), ring in sorted(self._rings.items()):
+            stats.setdefault(stage, {}).setdefault(scope, {})[name] = {
+                "count": ring.count,
+                **{
+                    key: round(latency * 1000, 1)
+                    for key, latency in ring.percentiles(PERCENTILES).items()
+                },
+            }
+        return stats
@@ -0,0 +1,69 @@
+"""Panel configuration handling for NSPanel Pro panels."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import json
+import logging
+from typing import Any
+
+from homeassistant.components import mqtt
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback, valid_entity_id
+
+from .const import MQTT_CONFIG_TOPIC
+from .stats import async_subscribe
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def entity_ids_from_config(config: dict[str, Any]) -> set[str]:
+    """Return the entity ids selected in a panel configuration."""
+    entity_ids: set[str] = set()
+    entities = config.get("entities")
+    if not isinstance(entities, dict):
+        return entity_ids
+
+    for selected in entities.values():
+        if isinstance(selected, list):
+            entity_ids.update(e for e in selected if isinstance(e, str) and "." in e)
+
+    return entity_ids
+
+
+def groups_from_config(config: dict[str, Any]) -> dict[str, list[str]]:
+    """Return the named entity groups defined in a panel configuration.
+
+    Groups are configured as ``"groups": {"downstairs": ["light.hall", ...]}``.
+    """
+    groups = config.get("groups")
+    if not isinstance(groups, dict):
+        return {}
+
+    return {
+        name: [e for e in members if isinstance(e, str) and valid_entity_id(e)]
+        for name, members in groups.items()
+        if isinstance(name, str) and isinstance(members, list)
+    }
+
+
+async def async_subscribe_panel_config(
+    hass: HomeAssistant,
+    panel_id: str,
+    config_callback: Callable[[dict[str, Any]], None],
+) -> CALLBACK_TYPE:
+    """Subscribe to the retained configuration of a panel."""
+
+    @callback
+    def _async_handle_config(msg: mqtt.ReceiveMessage) -> None:
+        """Handle a configuration published for the panel."""
+        try:
+            config = json.loads(msg.payload)
+        except ValueError:
+            _LOGGER.warning("Invalid configuration for panel %s", panel_id)
+            return
+
+        if isinstance(config, dict):
+            config_callback(config)
+
+    return await async_subscribe(
+        hass, MQTT_CONFIG_TOPIC.format(panel_id=panel_id), _async_handle_config
+    )
@@ -0,0 +1,126 @@
+"""Availability tracking of NSPanel Pro panels."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import logging
+
+from homeassistant.components import mqtt
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    HEARTBEAT_TIMEOUT,
+    MQTT_HEARTBEAT_TOPIC,
+    MQTT_STATUS_TOPIC,
+    PANEL_OFFLINE,
+    PANEL_ONLINE,
+)
+from .stats import async_subscribe
+
+_LOGGER = logging.getLogger(__name__)
+
+# Called with True when the panel (re)connects and False when it goes away
+PresenceListener = Callable[[bool], None]
+
+
+class PanelPresence:
+    """Follow whether a panel is connected.
+
+    The panel announces itself with a birth message on its status topic and
+    the broker publishes its last will (``offline``) when the connection
+    drops. Panels that also publish heartbeats are considered offline when
+    no heartbeat arrived for a while, which catches panels losing power
+    behind a broker that keeps their session. The state is unknown (None)
+    until the panel has been heard from.
+    """
+
+    def __init__(self, hass: HomeAssistant, panel_id: str) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self.panel_id = panel_id
+        self.online: bool | None = None
+        self._listeners: list[PresenceListener] = []
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._unsub_timeout: CALLBACK_TYPE | None = None
+
+    async def async_start(self) -> None:
+        """Start listening for status messages and heartbeats."""
+        self._unsubs.append(
+            await async_subscribe(
+                self.hass,
+                MQTT_STATUS_TOPIC.format(panel_id=self.panel_id),
+                self._async_handle_status,
+            )
+        )
+        self._unsubs.append(
+            await async_subscribe(
+                self.hass,
+                MQTT_HEARTBEAT_TOPIC.format(panel_id=self.panel_id),
+                self._async_handle_heartbeat,
+            )
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop listening for status messages and heartbeats."""
+        while self._unsubs:
+            self._unsubs.pop()()
+        self._async_cancel_timeout()
+
+    @callback
+    def async_add_listener(self, listener: PresenceListener) -> CALLBACK_TYPE:
+        """Call a listener when the panel connects or goes away."""
+        self._listeners.append(listener)
+
+        @callback
+        def _async_remove_listener() -> None:
+            self._listeners.remove(listener)
+
+        return _async_remove_listener
+
+    @callback
+    def _async_handle_status(self, msg: mqtt.ReceiveMessage) -> None:
+        """Handle a birth or last will message."""
+        payload = msg.payload.lower()
+        if payload == PANEL_ONLINE:
+            # A birth message is a new connection even if we missed the will
+            self._async_set_online(True, reconnected=True)
+        elif payload == PANEL_OFFLINE:
+            self._async_cancel_timeout()
+            self._async_set_online(False)
+
+    @callback
+    def _async_handle_heartbeat(self, msg: mqtt.ReceiveMessage) -> None:
+        """Keep the panel online until the next heartbeat is overdue."""
+        self._async_cancel_timeout()
+        self._unsub_timeout = async_call_later(
+            self.hass, HEARTBEAT_TIMEOUT, self._async_heartbeat_timeout
+        )
+        self._async_set_online(True)
+
+    @callback
+    def _async_heartbeat_timeout(self, _now: object) -> None:
+        """Mark the panel offline when its heartbeat stopped."""
+        self._unsub_timeout = None
+        _LOGGER.debug("No heartbeat from panel %s", self.panel_id)
+        self._async_set_online(False)
+
+    @callback
+    def _async_cancel_timeout(self) -> None:
+        """Cancel the pending heartbeat timeout."""
+        if self._unsub_timeout is not None:
+            self._unsub_timeout()
+            self._unsub_timeout = None
+
+    @callback
+    def _async_set_online(self, online: bool, reconnected: bool = False) -> None:
+        """Update the state and notify listeners of changes."""
+        if online == self.online and not reconnected:
+            return
+
+        self.online = online
+        _LOGGER.debug(
+            "Panel %s is %s", self.panel_id, PANEL_ONLINE if online else PANEL_OFFLINE
+        )
+        for listener in list(self._listeners):
+            listener(online)
@@ -0,0 +1,89 @@
+"""Command topic routing for NSPanel Pro panels."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import NamedTuple
+
+from homeassistant.core import valid_entity_id
+
+from .const import GROUP_SEGMENT, MQTT_BASE_TOPIC
+
+# Parsed topics remembered by the router, including rejected ones
+ROUTE_CACHE_SIZE = 1024
+
+
+class Route(NamedTuple):
+    """A parsed command topic, entity_id is None for group commands."""
+
+    entity_id: str | None
+    domain: str
+    action: str
+
+
+class TopicRouter:
+    """Parse command topics once and cache the result per topic.
+
+    Topics are validated against command patterns such as
+    ``domodreams/nspanelpro/cmd/light/+/set``; anything with missing or
+    extra segments, an unknown domain/action pair or an invalid entity id
+    is rejected instead of raising.
+    """
+
+    def __init__(
+        self,
+        patterns: Iterable[str],
+        max_size: int = ROUTE_CACHE_SIZE,
+        prefix: str | None = None,
+    ) -> None:
+        """Initialize the router from MQTT command patterns.
+
+        Patterns use the shared ``cmd/`` namespace; topics are parsed below
+        ``prefix``, which defaults to that namespace.
+        """
+        cmd_prefix = f"{MQTT_BASE_TOPIC}/cmd/"
+        self._prefix = prefix or cmd_prefix
+        self._routes: set[tuple[str, str]] = set()
+        for pattern in patterns:
+            domain, wildcard, action = pattern.removeprefix(cmd_prefix).split("/")
+            if wildcard != "+":
+                raise ValueError(f"Invalid command pattern: {pattern}")
+            self._routes.add((domain, action))
+
+        self._max_size = max_size
+        self._cache: dict[str, Route | None] = {}
+
+    def parse(self, topic: str) -> Route | None:
+        """Return the route of a topic, or None if it is not a valid command."""
+        try:
+            return self._cache[topic]
+        except KeyError:
+            pass
+
+        route = self._parse(topic)
+        if len(self._cache) >= self._max_size:
+            # Evict the oldest entry, dicts keep insertion order
+            del self._cache[next(iter(self._cache))]
+        self._cache[topic] = route
+        return route
+
+    def _parse(self, topic: str) -> Route | None:
+        """Parse and validate a command topic."""
+        if not topic.startswith(self._prefix):
+            return None
+
+        parts = topic[len(self._prefix) :].split("/")
+        if len(parts) != 3:
+            return None
+
+        domain, entity_name, action = parts
+        if (domain, action) not in self._routes:
+            return None
+
+        if entity_name == GROUP_SEGMENT:
+            return Route(None, domain, action)
+
+        entity_id = f"{domain}.{entity_name}"
+        if not valid_entity_id(entity_id):
+            return None
+
+        return Route(entity_id, domain, action)
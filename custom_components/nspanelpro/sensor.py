@@ -0,0 +1,216 @@
+"""Diagnostic sensors for NSPanel Pro integration."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from homeassistant.components.sensor import (
+    DOMAIN as SENSOR_DOMAIN,
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
+
+from .const import CONF_PANEL_ID, DOMAIN
+from .dispatcher import CommandDispatcher
+from .entity import NSPanelProEntity
+from .latency import SCOPE_PANEL, STAGE_SERVICE, STAGE_STATE
+
+
+@dataclass(frozen=True, kw_only=True)
+class NSPanelProSensorEntityDescription(SensorEntityDescription):
+    """Describes an NSPanel Pro diagnostic sensor."""
+
+    # Called with the panel, None for the commands of the shared topic layout
+    value_fn: Callable[[CommandDispatcher, str | None], StateType]
+
+
+SENSORS: tuple[NSPanelProSensorEntityDescription, ...] = (
+    NSPanelProSensorEntityDescription(
+        key="coalesced_commands",
+        translation_key="coalesced_commands",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda dispatcher, panel_id: dispatcher.async_get_scope(
+            panel_id
+        ).coalesced,
+    ),
+    NSPanelProSensorEntityDescription(
+        key="queue_depth",
+        translation_key="queue_depth",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda dispatcher, panel_id: dispatcher.async_get_queue(
+            panel_id
+        ).depth,
+    ),
+    NSPanelProSensorEntityDescription(
+        key="dropped_commands",
+        translation_key="dropped_commands",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda dispatcher, panel_id: dispatcher.async_get_queue(
+            panel_id
+        ).dropped,
+    ),
+    NSPanelProSensorEntityDescription(
+        key="rejected_commands",
+        translation_key="rejected_commands",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda dispatcher, panel_id: dispatcher.async_get_scope(
+            panel_id
+        ).rejected,
+    ),
+    NSPanelProSensorEntityDescription(
+        key="service_latency_p95",
+        translation_key="service_latency_p95",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda dispatcher, panel_id: dispatcher.latency.async_percentile(
+            STAGE_SERVICE, SCOPE_PANEL, dispatcher.async_get_queue(panel_id).name, 0.95
+        ),
+    ),
+    NSPanelProSensorEntityDescription(
+        key="state_latency_p95",
+        translation_key="state_latency_p95",
+        entity_category=EntityCategory.DIAGNOSTIC,
+        entity_registry_enabled_default=False,
+        device_class=SensorDeviceClass.DURATION,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda dispatcher, panel_id: dispatcher.latency.async_percentile(
+            STAGE_STATE, SCOPE_PANEL, dispatcher.async_get_queue(panel_id).name, 0.95
+        ),
+    ),
+)
+
+
+# Device holding the sensors of the commands on the shared topic layout
+SHARED_DEVICE_ID = "shared"
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up NSPanel Pro sensors from a config entry."""
+    dispatcher: CommandDispatcher = hass.data[DOMAIN]["dispatcher"]
+    panel_id = entry.data[CONF_PANEL_ID]
+    if dispatcher.async_get_scope(panel_id) is not dispatcher.shared:
+        async_add_entities(
+            NSPanelProSensor(entry, dispatcher, description)
+            for description in SENSORS
+        )
+        return
+
+    # Sensors of a panel that used the shared layout before it had a device
+    registry = er.async_get(hass)
+    for description in SENSORS:
+        if entity_id := registry.async_get_entity_id(
+            SENSOR_DOMAIN, DOMAIN, f"{panel_id}_{description.key}"
+        ):
+            registry.async_remove(entity_id)
+
+    _async_add_shared_sensors(hass, entry, dispatcher, async_add_entities)
+
+
+@callback
+def _async_add_shared_sensors(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    dispatcher: CommandDispatcher,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Let one entry on the shared topic layout hold the shared sensors.
+
+    The first entry adds them; when it unloads, the next one takes them over
+    with the same unique ids.
+    """
+    holders: dict[str, tuple[ConfigEntry, AddEntitiesCallback]] = hass.data[
+        DOMAIN
+    ].setdefault("shared_sensors", {})
+    if not holders:
+        async_add_entities(
+            NSPanelProSharedSensor(entry, dispatcher, description)
+            for description in SENSORS
+        )
+    holders[entry.entry_id] = (entry, async_add_entities)
+
+    @callback
+    def _async_hand_over() -> None:
+        """Pass the shared sensors on once the entry unloaded."""
+        held = next(iter(holders)) == entry.entry_id
+        del holders[entry.entry_id]
+        if held and holders:
+            holder, add_entities = next(iter(holders.values()))
+            add_entities(
+                NSPanelProSharedSensor(holder, dispatcher, description)
+                for description in SENSORS
+            )
+
+    entry.async_on_unload(_async_hand_over)
+
+
+class NSPanelProSensor(NSPanelProEntity, SensorEntity):
+    """Diagnostic sensor reading a counter of the command dispatcher.
+
+    Counters change far too often to push every update, so the sensor is
+    polled instead.
+    """
+
+    _attr_should_poll = True
+    entity_description: NSPanelProSensorEntityDescription
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        dispatcher: CommandDispatcher,
+        description: NSPanelProSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        super().__init__(entry, description.key)
+        self.entity_description = description
+        self._dispatcher = dispatcher
+        self._panel_id: str | None = entry.data[CONF_PANEL_ID]
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the current counter value."""
+        return self.entity_description.value_fn(self._dispatcher, self._panel_id)
+
+
+class NSPanelProSharedSensor(NSPanelProSensor):
+    """Diagnostic sensor of the commands on the shared topic layout.
+
+    These commands cannot be told apart by panel, so their counters belong
+    to a device of their own rather than to every panel on the layout.
+    """
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        dispatcher: CommandDispatcher,
+        description: NSPanelProSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor held by an entry on the shared layout."""
+        super().__init__(entry, dispatcher, description)
+        self._panel_id = None
+        self._attr_unique_id = f"{SHARED_DEVICE_ID}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, SHARED_DEVICE_ID)},
+            name="NSPanel Pro shared commands",
+            entry_type=DeviceEntryType.SERVICE,
+        )
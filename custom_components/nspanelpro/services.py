@@ -1,7 +1,6 @@
 """Services for NSPanel Pro integration."""
 from __future__ import annotations
 
-import json
 import logging
 from typing import Any
 
@@ -11,12 +10,21 @@ from homeassistant.components import mqtt
 from homeassistant.core import HomeAssistant, ServiceCall
 from homeassistant.helpers import config_validation as cv
 
-from .const import DOMAIN, MQTT_BASE_TOPIC
+from .config_store import PanelConfigStore
+from .const import DEFAULT_SNAPSHOT_MAX_BYTES, DOMAIN
+from .encoder import StateEncoder
+from .state_push import StatePushEngine, async_publish_snapshot, state_topic
+from .stats import async_get_stats
 
 _LOGGER = logging.getLogger(__name__)
 
 SERVICE_PUBLISH_STATE = "publish_state"
 SERVICE_SEND_CONFIG = "send_config"
+SERVICE_PUBLISH_SNAPSHOT = "publish_snapshot"
+SERVICE_PROFILE = "profile"
+
+# Seconds the MQTT handlers are profiled for by default
+DEFAULT_PROFILE_DURATION = 60
 
 PUBLISH_STATE_SCHEMA = vol.Schema(
     {
@@ -28,11 +36,43 @@ PUBLISH_STATE_SCHEMA = vol.Schema(
 SEND_CONFIG_SCHEMA = vol.Schema(
     {
         vol.Required("panel_id"): cv.string,
-        vol.Required("config"): dict,
+        vol.Required("config"): vol.Schema(
+            # Entity ids per category, e.g. {"lights": ["light.kitchen"]}
+            {vol.Optional("entities"): {cv.string: [cv.string]}},
+            extra=vol.ALLOW_EXTRA,
+        ),
+        vol.Optional("force", default=False): cv.boolean,
+    }
+)
+
+PUBLISH_SNAPSHOT_SCHEMA = vol.Schema(
+    {
+        vol.Required("panel_id"): cv.string,
+        vol.Optional("entity_id"): cv.entity_ids,
+        vol.Optional("max_bytes"): vol.All(vol.Coerce(int), vol.Range(min=256)),
+    }
+)
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("duration", default=DEFAULT_PROFILE_DURATION): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
     }
 )
 
 
+def _get_state_push(hass: HomeAssistant, panel_id: str) -> StatePushEngine | None:
+    """Return the state push engine of a configured panel."""
+    for data in hass.data[DOMAIN].values():
+        if not isinstance(data, dict):
+            continue
+        state_push = data.get("state_push")
+        if state_push is not None and state_push.panel_id == panel_id:
+            return state_push
+    return None
+
+
 async def async_setup_services(hass: HomeAssistant) -> None:
     """Set up services for NSPanel Pro integration."""
 
@@ -46,20 +86,14 @@ async def async_setup_services(hass: HomeAssistant) -> None:
             _LOGGER.warning("Entity %s not found", entity_id)
             return
 
-        # Build state payload
-        payload = {
-            "entity_id": entity_id,
-            "state": state.state,
-            "attributes": dict(state.attributes),
-            "last_updated": state.last_updated.isoformat(),
-        }
-
-        topic = f"{MQTT_BASE_TOPIC}/state/{panel_id}/{entity_id.replace('.', '/')}"
+        topic = state_topic(panel_id, entity_id)
+        state_push = _get_state_push(hass, panel_id)
+        encoder = state_push.encoder if state_push is not None else StateEncoder()
 
         await mqtt.async_publish(
             hass,
             topic,
-            json.dumps(payload),
+            encoder.encode(state),
             retain=True,
         )
 
@@ -70,16 +104,34 @@ async def async_setup_services(hass: HomeAssistant) -> None:
         panel_id = call.data["panel_id"]
         config = call.data["config"]
 
-        topic = f"{MQTT_BASE_TOPIC}/config/{panel_id}"
+        config_store: PanelConfigStore = hass.data[DOMAIN]["config_store"]
+        await config_store.async_publish(panel_id, config, call.data["force"])
 
-        await mqtt.async_publish(
-            hass,
-            topic,
-            json.dumps(config),
-            retain=True,
+    async def handle_publish_snapshot(call: ServiceCall) -> None:
+        """Handle the publish_snapshot service call."""
+        panel_id = call.data["panel_id"]
+        entity_ids = call.data.get("entity_id")
+        max_bytes = call.data.get("max_bytes")
+
+        state_push = _get_state_push(hass, panel_id)
+        if state_push is not None:
+            await state_push.async_publish_snapshot(entity_ids, max_bytes)
+            return
+
+        if entity_ids is None:
+            _LOGGER.warning(
+                "Panel %s is not configured, entity_id is required", panel_id
+            )
+            return
+
+        await async_publish_snapshot(
+            hass, panel_id, entity_ids, max_bytes or DEFAULT_SNAPSHOT_MAX_BYTES
         )
 
-        _LOGGER.debug("Published config to %s", topic)
+    async def handle_profile(call: ServiceCall) -> None:
+        """Handle the profile service call."""
+        if not async_get_stats(hass).async_start_profile(call.data["duration"]):
+            _LOGGER.warning("The MQTT handlers are already being profiled")
 
     hass.services.async_register(
         DOMAIN,
@@ -95,8 +147,24 @@ async def async_setup_services(hass: HomeAssistant) -> None:
         schema=SEND_CONFIG_SCHEMA,
     )
 
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PUBLISH_SNAPSHOT,
+        handle_publish_snapshot,
+        schema=PUBLISH_SNAPSHOT_SCHEMA,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        handle_profile,
+        schema=PROFILE_SCHEMA,
+    )
+
 
 async def async_unload_services(hass: HomeAssistant) -> None:
     """Unload services for NSPanel Pro integration."""
     hass.services.async_remove(DOMAIN, SERVICE_PUBLISH_STATE)
     hass.services.async_remove(DOMAIN, SERVICE_SEND_CONFIG)
+    hass.services.async_remove(DOMAIN, SERVICE_PUBLISH_SNAPSHOT)
+    hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
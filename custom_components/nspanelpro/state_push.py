@@ -0,0 +1,334 @@
+"""Event-driven state push engine for NSPanel Pro panels."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Iterable
+import logging
+from typing import Any
+
+from homeassistant.components import mqtt
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import (
+    CONF_DELTA_UPDATES,
+    CONF_PANEL_ID,
+    CONF_PAYLOAD_ENCODING,
+    CONF_SNAPSHOT_MAX_BYTES,
+    DEFAULT_DELTA_UPDATES,
+    DEFAULT_PAYLOAD_ENCODING,
+    DEFAULT_SNAPSHOT_MAX_BYTES,
+    DELTA_CACHE_SIZE,
+    MQTT_RESYNC_TOPIC,
+    MQTT_SNAPSHOT_TOPIC,
+    MQTT_STATE_TOPIC,
+)
+from .encoder import Payload, StateEncoder
+from .stats import async_subscribe
+from .throttle import PublishThrottle
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def state_topic(panel_id: str, entity_id: str) -> str:
+    """Return the retained state topic of an entity for a panel."""
+    return f"{MQTT_STATE_TOPIC}/{panel_id}/{entity_id.replace('.', '/')}"
+
+
+# Room reserved in every snapshot chunk for the envelope around the states
+_SNAPSHOT_ENVELOPE_BYTES = 48
+
+
+def build_snapshot_chunks(
+    states: Iterable[State],
+    max_bytes: int,
+    encoder: StateEncoder,
+    seq: int | None = None,
+) -> list[Payload]:
+    """Pack state payloads into as few snapshot messages as fit max_bytes.
+
+    A single state larger than the limit is still sent, alone in its chunk.
+    """
+    budget = max(max_bytes - _SNAPSHOT_ENVELOPE_BYTES, 1)
+    chunks: list[list[dict[str, Any]]] = []
+    current: list[dict[str, Any]] = []
+    size = 0
+
+    for state in states:
+        payload = encoder.build(state)
+        length = len(encoder.dumps(payload)) + 1  # separator
+        if current and size + length > budget:
+            chunks.append(current)
+            current = []
+            size = 0
+        current.append(payload)
+        size += length
+
+    if current or not chunks:
+        chunks.append(current)
+
+    parts = len(chunks)
+    envelope: dict[str, Any] = {"parts": parts}
+    if seq is not None:
+        envelope["seq"] = seq
+    return [
+        encoder.dumps({**envelope, "part": part, "states": chunk})
+        for part, chunk in enumerate(chunks, 1)
+    ]
+
+
+async def async_publish_snapshot(
+    hass: HomeAssistant,
+    panel_id: str,
+    entity_ids: Iterable[str],
+    max_bytes: int,
+    encoder: StateEncoder | None = None,
+    seq: int | None = None,
+) -> int:
+    """Publish the states of entities to a panel in batched messages.
+
+    Returns the number of messages published.
+    """
+    states = [
+        state
+        for entity_id in sorted(entity_ids)
+        if (state := hass.states.get(entity_id)) is not None
+    ]
+    chunks = build_snapshot_chunks(
+        states, max_bytes, encoder or StateEncoder(), seq
+    )
+    topic = MQTT_SNAPSHOT_TOPIC.format(panel_id=panel_id)
+
+    for chunk in chunks:
+        await mqtt.async_publish(hass, topic, chunk)
+
+    _LOGGER.debug(
+        "Published snapshot of %d entities to %s in %d messages",
+        len(states),
+        topic,
+        len(chunks),
+    )
+    return len(chunks)
+
+
+class StatePushEngine:
+    """Publish state changes of the entities configured on a panel.
+
+    Live updates are paused while the panel is offline; when it comes back
+    it gets one batched snapshot of its entities instead.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        """Initialize the engine."""
+        self.hass = hass
+        self.panel_id: str = entry.data[CONF_PANEL_ID]
+        self.snapshot_max_bytes: int = int(
+            entry.options.get(CONF_SNAPSHOT_MAX_BYTES, DEFAULT_SNAPSHOT_MAX_BYTES)
+        )
+        self.encoder = StateEncoder(
+            entry.options.get(CONF_PAYLOAD_ENCODING, DEFAULT_PAYLOAD_ENCODING)
+        )
+        self.delta_updates: bool = entry.options.get(
+            CONF_DELTA_UPDATES, DEFAULT_DELTA_UPDATES
+        )
+        self.entity_ids: set[str] = set()
+        # Full payload the panel holds per entity, least recently used first
+        self._last_sent: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        # Update payload the panel last received on top of its full payload
+        self._last_update: dict[str, dict[str, Any]] = {}
+        self._seq = 0
+        self.paused = False
+        self.suppressed = 0
+        # Rate limits, deadbands and heartbeats of noisy domains
+        self.throttle = PublishThrottle(hass, self.panel_id, self._async_flush)
+        self._unsubs: list[CALLBACK_TYPE] = []
+        self._unsub_track: CALLBACK_TYPE | None = None
+
+    async def async_start(self) -> None:
+        """Start listening for resync requests."""
+        self._unsubs.append(
+            await async_subscribe(
+                self.hass,
+                MQTT_RESYNC_TOPIC.format(panel_id=self.panel_id),
+                self._async_handle_resync,
+            )
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop listening for panel messages and state changes."""
+        while self._unsubs:
+            self._unsubs.pop()()
+        if self._unsub_track is not None:
+            self._unsub_track()
+            self._unsub_track = None
+        self.throttle.async_cancel()
+        self._last_sent.clear()
+        self._last_update.clear()
+
+    @callback
+    def async_set_online(self, online: bool) -> None:
+        """Pause live updates while the panel is offline.
+
+        A snapshot is sent when the panel (re)connects, it brings the panel
+        up to date with the changes it missed.
+        """
+        self.paused = not online
+        if not online or not self.entity_ids:
+            return
+
+        _LOGGER.debug("Panel %s connected, sending snapshot", self.panel_id)
+        self.hass.async_create_task(self.async_publish_snapshot())
+
+    @callback
+    def _async_handle_resync(self, msg: mqtt.ReceiveMessage) -> None:
+        """Send a full snapshot when the panel asks for a resync."""
+        _LOGGER.debug("Panel %s requested a resync", self.panel_id)
+        self.hass.async_create_task(self.async_publish_snapshot())
+
+    async def async_publish_snapshot(
+        self, entity_ids: Iterable[str] | None = None, max_bytes: int | None = None
+    ) -> int:
+        """Publish a snapshot of the configured or the given entities.
+
+        The panel then holds full payloads of the configured ones, so later
+        updates are published as partial payloads or deltas against them.
+        """
+        if entity_ids is None:
+            entity_ids = self.entity_ids
+
+        for entity_id in entity_ids:
+            # Other entities get no updates, they would only take cache slots
+            if entity_id not in self.entity_ids:
+                continue
+            if (state := self.hass.states.get(entity_id)) is not None:
+                self._async_remember(state, self.encoder.build(state))
+                self.throttle.async_published(state)
+
+        return await async_publish_snapshot(
+            self.hass,
+            self.panel_id,
+            entity_ids,
+            self.snapshot_max_bytes if max_bytes is None else max_bytes,
+            self.encoder,
+            self._async_next_seq() if self.delta_updates else None,
+        )
+
+    @callback
+    def async_set_entities(self, entity_ids: set[str]) -> None:
+        """Track state changes for a new set of entities."""
+        if entity_ids == self.entity_ids:
+            return
+
+        if self._unsub_track is not None:
+            self._unsub_track()
+            self._unsub_track = None
+
+        for entity_id in self.entity_ids - entity_ids:
+            self._last_sent.pop(entity_id, None)
+            self._last_update.pop(entity_id, None)
+            self.throttle.async_forget(entity_id)
+
+        self.entity_ids = entity_ids
+        _LOGGER.debug(
+            "Tracking %d entities for panel %s", len(entity_ids), self.panel_id
+        )
+
+        if not entity_ids:
+            return
+
+        self._unsub_track = async_track_state_change_event(
+            self.hass, list(entity_ids), self._async_state_changed
+        )
+
+        for entity_id in entity_ids:
+            if (state := self.hass.states.get(entity_id)) is not None:
+                self._async_publish(state)
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Publish the new state of a tracked entity."""
+        if (new_state := event.data["new_state"]) is not None:
+            self._async_publish(new_state)
+
+    @callback
+    def _async_next_seq(self) -> int:
+        """Return the next sequence number of the panel."""
+        self._seq += 1
+        return self._seq
+
+    @property
+    def _updates_partial(self) -> bool:
+        """Return whether updates only carry the attributes projected for them."""
+        return self.encoder.compact and not self.delta_updates
+
+    @callback
+    def _async_remember(self, state: State, payload: dict[str, Any]) -> None:
+        """Remember the full payload sent for an entity, evicting the oldest."""
+        entity_id = state.entity_id
+        self._last_sent[entity_id] = payload
+        self._last_sent.move_to_end(entity_id)
+        if len(self._last_sent) > DELTA_CACHE_SIZE:
+            self._last_update.pop(self._last_sent.popitem(last=False)[0], None)
+
+        if self._updates_partial:
+            # Lets the first update be compared with what the panel has
+            self._last_update[entity_id] = self.encoder.build(state, full=False)
+
+    @callback
+    def _async_flush(self, entity_id: str, heartbeat: bool) -> None:
+        """Publish the current state of an entity held back by its policy."""
+        if entity_id in self.entity_ids and (
+            state := self.hass.states.get(entity_id)
+        ) is not None:
+            self._async_publish(state, heartbeat)
+
+    @callback
+    def _async_publish(self, state: State, heartbeat: bool = False) -> None:
+        """Publish a state unless the panel already has the same payload.
+
+        The first payload of an entity is a full one. Later payloads only
+        carry the attributes projected for updates or, with delta updates,
+        only the fields that changed since the last payload. Changes of
+        noisy domains may be held back by their publish policy; heartbeats
+        are published even when nothing changed.
+        """
+        if self.paused:
+            self.suppressed += 1
+            return
+
+        if not heartbeat and not self.throttle.async_allow(state):
+            return
+
+        entity_id = state.entity_id
+        last = self._last_sent.get(entity_id)
+        full = last is None or not self._updates_partial
+        payload = self.encoder.build(state, full=full)
+        previous = last if full else self._last_update.get(entity_id)
+        if self.encoder.unchanged(previous, payload) and not heartbeat:
+            return
+
+        self.throttle.async_published(state)
+        if full:
+            self._async_remember(state, payload)
+        else:
+            self._last_sent.move_to_end(entity_id)
+            self._last_update[entity_id] = payload
+        message = payload
+        if self.delta_updates:
+            if last is None:
+                message = dict(payload)
+            else:
+                message = self.encoder.diff(last, payload)
+            message[self.encoder.seq_key] = self._async_next_seq()
+
+        self.hass.async_create_task(
+            mqtt.async_publish(
+                self.hass,
+                state_topic(self.panel_id, entity_id),
+                self.encoder.dumps(message),
+                # A reconnecting panel needs a full payload, not an update
+                retain=full and (last is None or not self.delta_updates),
+            )
+        )
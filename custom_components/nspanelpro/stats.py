@@ -0,0 +1,225 @@
+"""Runtime statistics and profiling of the NSPanel Pro MQTT bridge."""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+from collections.abc import Callable
+import io
+import logging
+import pstats
+import time
+from typing import Any
+
+from homeassistant.components import mqtt
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+MessageCallback = Callable[[mqtt.ReceiveMessage], None]
+
+# Functions listed in the summary of a profile, by cumulative time
+PROFILE_TOP_FUNCTIONS = 20
+
+
+class HandlerStats:
+    """Messages and execution time of the handler of one subscription."""
+
+    __slots__ = ("subscribed", "messages", "total", "slowest")
+
+    def __init__(self) -> None:
+        """Initialize the counters."""
+        self.subscribed = False
+        self.messages = 0
+        # Seconds spent in the handler
+        self.total = 0.0
+        self.slowest = 0.0
+
+
+class BridgeStats:
+    """Count and time the messages handled by the MQTT bridge.
+
+    Subscriptions made through ``async_subscribe`` wrap their handler once;
+    the wrapper costs two clock reads and a few additions per message, so
+    the counters stay enabled, unlike debug logging. While a profile runs,
+    the handlers are also run under cProfile until its window ends.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the statistics."""
+        self.hass = hass
+        # Subscribed topic -> handler statistics, kept after unsubscribing
+        self.handlers: dict[str, HandlerStats] = {}
+        self.last_profile: dict[str, Any] | None = None
+        self._profile: cProfile.Profile | None = None
+        self._profile_started = 0.0
+        self._profile_timer: asyncio.TimerHandle | None = None
+
+    @property
+    def profiling(self) -> bool:
+        """Return whether a profile is running."""
+        return self._profile is not None
+
+    @callback
+    def async_wrap(
+        self, topic: str, msg_callback: MessageCallback
+    ) -> MessageCallback:
+        """Return a handler counting and timing the messages of a topic."""
+        if (stats := self.handlers.get(topic)) is None:
+            stats = self.handlers[topic] = HandlerStats()
+        perf_counter = time.perf_counter
+
+        @callback
+        def _async_handle_message(msg: mqtt.ReceiveMessage) -> None:
+            """Run the handler, recording how long it took."""
+            started = perf_counter()
+            try:
+                if (profile := self._profile) is None:
+                    msg_callback(msg)
+                else:
+                    self._run_profiled(profile, msg_callback, msg)
+            finally:
+                elapsed = perf_counter() - started
+                stats.messages += 1
+                stats.total += elapsed
+                if elapsed > stats.slowest:
+                    stats.slowest = elapsed
+
+        return _async_handle_message
+
+    @staticmethod
+    def _run_profiled(
+        profile: cProfile.Profile,
+        msg_callback: MessageCallback,
+        msg: mqtt.ReceiveMessage,
+    ) -> None:
+        """Run a handler under the profile, unprofiled if it cannot start."""
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active, the message must still be handled
+            msg_callback(msg)
+            return
+        try:
+            msg_callback(msg)
+        finally:
+            profile.disable()
+
+    @callback
+    def async_start_profile(self, duration: float) -> bool:
+        """Profile the handlers for a number of seconds.
+
+        Returns False if a profile is already running.
+        """
+        if self._profile is not None:
+            return False
+
+        self._profile = cProfile.Profile()
+        self._profile_started = time.time()
+        self._profile_timer = self.hass.loop.call_later(
+            duration, self._async_finish_profile
+        )
+        _LOGGER.info("Profiling MQTT handlers for %s seconds", duration)
+        return True
+
+    @callback
+    def async_stop(self) -> None:
+        """Discard a running profile."""
+        if self._profile_timer is not None:
+            self._profile_timer.cancel()
+            self._profile_timer = None
+        self._profile = None
+
+    @callback
+    def _async_finish_profile(self) -> None:
+        """Save the profile once its window ended."""
+        self._profile_timer = None
+        profile, self._profile = self._profile, None
+        if profile is None:
+            return
+
+        path = self.hass.config.path(
+            f"{DOMAIN}_profile.{int(self._profile_started)}.cprof"
+        )
+        self.hass.async_create_task(
+            self._async_save_profile(
+                profile, path, self._profile_started, time.time()
+            )
+        )
+
+    async def _async_save_profile(
+        self,
+        profile: cProfile.Profile,
+        path: str,
+        started: float,
+        finished: float,
+    ) -> None:
+        """Write a profile to disk and keep a summary for diagnostics."""
+        summary = await self.hass.async_add_executor_job(
+            _save_profile, profile, path
+        )
+        self.last_profile = {
+            "path": path,
+            "started": dt_util.utc_from_timestamp(started).isoformat(),
+            "duration": round(finished - started, 1),
+            "top_functions": summary,
+        }
+        _LOGGER.info("Wrote profile of the MQTT handlers to %s", path)
+
+    @callback
+    def async_diagnostics(self) -> dict[str, Any]:
+        """Return the statistics of every subscription with times in ms."""
+        return {
+            topic: {
+                "subscribed": stats.subscribed,
+                "messages": stats.messages,
+                "total_ms": round(stats.total * 1000, 1),
+                "mean_ms": round(stats.total * 1000 / stats.messages, 3)
+                if stats.messages
+                else None,
+                "slowest_ms": round(stats.slowest * 1000, 3),
+            }
+            for topic, stats in sorted(self.handlers.items())
+        }
+
+
+def _save_profile(profile: cProfile.Profile, path: str) -> list[str]:
+    """Dump a profile and return its most expensive functions."""
+    profile.create_stats()
+    profile.dump_stats(path)
+
+    output = io.StringIO()
+    stats = pstats.Stats(profile, stream=output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+    return [line for line in output.getvalue().splitlines() if line.strip()]
+
+
+@callback
+def async_get_stats(hass: HomeAssistant) -> BridgeStats:
+    """Return the statistics shared by all panels."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if (stats := data.get("stats")) is None:
+        stats = data["stats"] = BridgeStats(hass)
+    return stats
+
+
+async def async_subscribe(
+    hass: HomeAssistant, topic: str, msg_callback: MessageCallback
+) -> CALLBACK_TYPE:
+    """Subscribe to a topic of the bridge, recording its messages."""
+    bridge_stats = async_get_stats(hass)
+    unsub = await mqtt.async_subscribe(
+        hass, topic, bridge_stats.async_wrap(topic, msg_callback)
+    )
+    handler = bridge_stats.handlers[topic]
+    handler.subscribed = True
+
+    @callback
+    def _async_unsubscribe() -> None:
+        """Unsubscribe, keeping the counters of the topic."""
+        handler.subscribed = False
+        unsub()
+
+    return _async_unsubscribe
@@ -0,0 +1,194 @@
+"""Publish policies for noisy entities of NSPanel Pro panels."""
+from __future__ import annotations
+
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+
+from homeassistant.core import HomeAssistant, State, callback
+
+from .timer_wheel import async_get_timer_wheel
+
+# Called with the entity id and whether the publish is a heartbeat
+FlushCallback = Callable[[str, bool], None]
+
+
+@dataclass(frozen=True, slots=True)
+class PublishPolicy:
+    """How often state changes of a domain are published to a panel.
+
+    ``min_interval`` is the minimum number of seconds between two publishes
+    of an entity; changes within the interval are held and the latest one
+    is published when it expires. A change that only moves ``deadbands``
+    attributes by less than their band since the last publish is held until
+    the next heartbeat. ``max_age`` republishes an entity that was not
+    published for that many seconds; deadbands need it so held changes
+    reach the panel eventually.
+    """
+
+    min_interval: float = 0
+    deadbands: Mapping[str, float] = field(default_factory=dict)
+    max_age: float | None = None
+
+
+PUBLISH_POLICIES: dict[str, PublishPolicy] = {
+    # The measured temperature of many thermostats jitters around its value
+    "climate": PublishPolicy(
+        min_interval=1, deadbands={"current_temperature": 0.2}, max_age=300
+    ),
+    # A moving cover reports its position many times per second
+    "cover": PublishPolicy(min_interval=0.5),
+}
+
+
+def _within_deadband(policy: PublishPolicy, old: State, new: State) -> bool:
+    """Return whether a change only moved deadband attributes within band."""
+    if old.state != new.state:
+        return False
+
+    old_attributes, new_attributes = old.attributes, new.attributes
+    if old_attributes.keys() != new_attributes.keys():
+        return False
+
+    for name, value in new_attributes.items():
+        previous = old_attributes[name]
+        if value == previous:
+            continue
+        if (band := policy.deadbands.get(name)) is None:
+            return False
+        try:
+            if abs(value - previous) >= band:
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+@dataclass(slots=True)
+class _Published:
+    """What a panel last got for a throttled entity."""
+
+    state: State
+    time: float
+    # A change is held until the interval flush of the entity
+    held: bool = False
+
+
+class PublishThrottle:
+    """Apply the publish policies of a panel's entities.
+
+    Held changes and heartbeats are flushed through the timer wheel shared
+    by all panels. A flush publishes the state the entity has by then, so
+    the panel always ends up with the latest value.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        panel_id: str,
+        flush: FlushCallback,
+        policies: Mapping[str, PublishPolicy] = PUBLISH_POLICIES,
+    ) -> None:
+        """Initialize the throttle."""
+        self.hass = hass
+        self.panel_id = panel_id
+        self.policies = policies
+        # State changes held back by a policy
+        self.throttled = 0
+        self._flush = flush
+        self._wheel = async_get_timer_wheel(hass)
+        self._published: dict[str, _Published] = {}
+
+    @callback
+    def async_allow(self, state: State) -> bool:
+        """Return whether a state change may be published now.
+
+        Otherwise the change is held and published by a later flush.
+        """
+        if (policy := self.policies.get(state.domain)) is None:
+            return True
+        if (published := self._published.get(state.entity_id)) is None:
+            return True
+        if published.held:
+            self.throttled += 1
+            return False
+
+        now = self.hass.loop.time()
+        if now - published.time < policy.min_interval:
+            published.held = True
+            self.throttled += 1
+            self._async_schedule(
+                state.entity_id, published.time + policy.min_interval - now
+            )
+            return False
+
+        if (
+            policy.deadbands
+            and policy.max_age is not None
+            and _within_deadband(policy, published.state, state)
+        ):
+            # The next heartbeat publishes whatever the state is by then
+            self.throttled += 1
+            return False
+
+        return True
+
+    @callback
+    def async_published(self, state: State) -> None:
+        """Record that a state was published, scheduling its heartbeat."""
+        if (policy := self.policies.get(state.domain)) is None:
+            return
+
+        entity_id = state.entity_id
+        self._published[entity_id] = _Published(state, self.hass.loop.time())
+        if policy.max_age is not None:
+            self._async_schedule(entity_id, policy.max_age)
+        else:
+            self._wheel.async_cancel((self.panel_id, entity_id))
+
+    @callback
+    def async_forget(self, entity_id: str) -> None:
+        """Drop a held change and the heartbeat of an entity."""
+        if self._published.pop(entity_id, None) is not None:
+            self._wheel.async_cancel((self.panel_id, entity_id))
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop all held changes and heartbeats."""
+        for entity_id in self._published:
+            self._wheel.async_cancel((self.panel_id, entity_id))
+        self._published.clear()
+
+    @callback
+    def _async_schedule(self, entity_id: str, delay: float) -> None:
+        """Flush an entity after a delay."""
+        self._wheel.async_schedule(
+            (self.panel_id, entity_id),
+            delay,
+            lambda: self._async_flush(entity_id),
+        )
+
+    @callback
+    def _async_flush(self, entity_id: str) -> None:
+        """Publish the held change or the heartbeat of an entity."""
+        if (published := self._published.get(entity_id)) is None:
+            return
+
+        heartbeat = not published.held
+        published.held = False
+        self._flush(entity_id, heartbeat)
+
+        if self._published.get(entity_id) is not published:
+            return
+        if published.held:
+            # Flushed before the interval ran out, the change goes on the next
+            # tick rather than waiting for the heartbeat
+            return
+
+        # Nothing was published, the entity still needs its heartbeat
+        if (max_age := self.policies[entity_id.partition(".")[0]].max_age) is None:
+            return
+        if heartbeat:
+            self._async_schedule(entity_id, max_age)
+        else:
+            now = self.hass.loop.time()
+            self._async_schedule(entity_id, max(published.time + max_age - now, 0))
@@ -0,0 +1,105 @@
+"""Shared timer wheel for delayed state publishes of NSPanel Pro panels."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Hashable
+import heapq
+import math
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, TIMER_WHEEL_RESOLUTION
+
+
+class TimerWheel:
+    """Run actions after a delay, driven by a single event loop timer.
+
+    Deadlines are rounded up to the wheel resolution and actions due on the
+    same tick share a bucket, so thousands of throttled entities cost one
+    loop timer instead of one each. An action is scheduled per key;
+    scheduling a key again replaces its pending action.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, resolution: float = TIMER_WHEEL_RESOLUTION
+    ) -> None:
+        """Initialize the wheel with a resolution in seconds."""
+        self.hass = hass
+        self.resolution = resolution
+        self._buckets: dict[int, dict[Hashable, Callable[[], None]]] = {}
+        self._due: dict[Hashable, int] = {}
+        # Ticks that have or had a bucket, stale ones are skipped when popped
+        self._ticks: list[int] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._timer_tick: int | None = None
+
+    def __len__(self) -> int:
+        """Return the number of scheduled actions."""
+        return len(self._due)
+
+    @callback
+    def async_schedule(
+        self, key: Hashable, delay: float, action: Callable[[], None]
+    ) -> None:
+        """Run an action for a key after a delay in seconds."""
+        self.async_cancel(key)
+        tick = math.ceil((self.hass.loop.time() + delay) / self.resolution)
+        if (bucket := self._buckets.get(tick)) is None:
+            bucket = self._buckets[tick] = {}
+            heapq.heappush(self._ticks, tick)
+        bucket[key] = action
+        self._due[key] = tick
+
+        if self._timer_tick is None or tick < self._timer_tick:
+            self._async_arm(tick)
+
+    @callback
+    def async_cancel(self, key: Hashable) -> None:
+        """Cancel the pending action of a key."""
+        if (tick := self._due.pop(key, None)) is None:
+            return
+        bucket = self._buckets[tick]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[tick]
+        if not self._due and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._timer_tick = None
+
+    @callback
+    def _async_arm(self, tick: int) -> None:
+        """Wake up at a tick."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer_tick = tick
+        self._timer = self.hass.loop.call_at(tick * self.resolution, self._async_tick)
+
+    @callback
+    def _async_tick(self) -> None:
+        """Run the actions that are due and wait for the next bucket."""
+        self._timer = None
+        self._timer_tick = None
+        now = self.hass.loop.time()
+        ticks = self._ticks
+        while ticks and ticks[0] * self.resolution <= now:
+            if (bucket := self._buckets.pop(heapq.heappop(ticks), None)) is None:
+                continue
+            for key in bucket:
+                del self._due[key]
+            for action in bucket.values():
+                action()
+
+        while ticks and ticks[0] not in self._buckets:
+            heapq.heappop(ticks)
+        if ticks:
+            self._async_arm(ticks[0])
+
+
+@callback
+def async_get_timer_wheel(hass: HomeAssistant) -> TimerWheel:
+    """Return the timer wheel shared by all panels."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if (wheel := data.get("timer_wheel")) is None:
+        wheel = data["timer_wheel"] = TimerWheel(hass)
+    return wheel
@@ -0,0 +1,100 @@
+"""Websocket commands for the NSPanel Pro configuration card."""
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .catalog import EntityCatalog
+from .const import CATALOG_DOMAINS, CATALOG_PAGE_SIZE, DOMAIN
+
+WS_TYPE_CATALOG = f"{DOMAIN}/catalog"
+WS_TYPE_CATALOG_SUBSCRIBE = f"{DOMAIN}/catalog/subscribe"
+
+_DOMAINS_SCHEMA = vol.All([vol.In(CATALOG_DOMAINS)], vol.Length(min=1))
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant) -> None:
+    """Register the websocket commands of the card."""
+    websocket_api.async_register_command(hass, ws_catalog)
+    websocket_api.async_register_command(hass, ws_catalog_subscribe)
+
+
+@callback
+def _async_get_catalog(hass: HomeAssistant) -> EntityCatalog:
+    """Return the entity catalog, building it on first use."""
+    if (catalog := hass.data[DOMAIN].get("catalog")) is None:
+        catalog = hass.data[DOMAIN]["catalog"] = EntityCatalog(hass)
+        catalog.async_start()
+    return catalog
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_TYPE_CATALOG,
+        vol.Optional("domains"): _DOMAINS_SCHEMA,
+        vol.Optional("area_id"): str,
+        vol.Optional("search"): str,
+        vol.Optional("offset", default=0): vol.All(int, vol.Range(min=0)),
+        vol.Optional("limit", default=CATALOG_PAGE_SIZE): vol.All(
+            int, vol.Range(min=1, max=1000)
+        ),
+    }
+)
+@callback
+def ws_catalog(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Return a page of the entities a panel can show."""
+    connection.send_result(
+        msg["id"],
+        _async_get_catalog(hass).async_query(
+            msg.get("domains"),
+            msg.get("area_id"),
+            msg.get("search"),
+            msg["offset"],
+            msg["limit"],
+        ),
+    )
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): WS_TYPE_CATALOG_SUBSCRIBE,
+        vol.Optional("domains"): _DOMAINS_SCHEMA,
+    }
+)
+@callback
+def ws_catalog_subscribe(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Send changed and removed catalog entries as they happen."""
+
+    @callback
+    def _async_forward(changed: list[dict[str, Any]], removed: list[str]) -> None:
+        """Forward catalog changes to the card."""
+        connection.send_message(
+            websocket_api.event_message(
+                msg["id"], {"changed": changed, "removed": removed}
+            )
+        )
+
+    @callback
+    def _async_stopped() -> None:
+        """Tell the card the catalog stopped, so it subscribes again."""
+        connection.send_message(
+            websocket_api.event_message(msg["id"], {"invalidated": True})
+        )
+
+    connection.subscriptions[msg["id"]] = _async_get_catalog(hass).async_subscribe(
+        msg.get("domains"), _async_forward, _async_stopped
+    )
+    connection.send_result(msg["id"])
@@ -3,22 +3,67 @@
  * A Lovelace card for configuring NSPanel Pro panels
  */
 
+// Catalog domain -> entity list of the card
+const DOMAIN_TYPES = {
+  light: 'lights',
+  cover: 'covers',
+  climate: 'climates',
+  switch: 'switches',
+  fan: 'fans',
+  scene: 'scenes',
+  script: 'scripts',
+  media_player: 'media_players',
+  lock: 'locks',
+};
+// Entity list -> section label
+const TYPE_LABELS = {
+  lights: 'Lights',
+  covers: 'Covers',
+  climates: 'Climate',
+  switches: 'Switches',
+  fans: 'Fans',
+  scenes: 'Scenes',
+  scripts: 'Scripts',
+  media_players: 'Media players',
+  locks: 'Locks',
+};
+// Icons of the lists without an inline SVG icon
+const TYPE_ICONS = {
+  switches: 'mdi:toggle-switch',
+  fans: 'mdi:fan',
+  scenes: 'mdi:palette',
+  scripts: 'mdi:script-text',
+  media_players: 'mdi:speaker',
+  locks: 'mdi:lock',
+};
+const CATALOG_PAGE_SIZE = 500;
+const SEARCH_DELAY = 300;
+
+// Entity list virtualization
+const LIST_HEIGHT = 360;
+const ROW_HEIGHT = 48;
+const ROW_GAP = 8;
+const MIN_COLUMN_WIDTH = 200;
+const OVERSCAN_ROWS = 4;
+
+const emptyLists = () =>
+  Object.fromEntries(Object.values(DOMAIN_TYPES).map((type) => [type, []]));
+
 class NSPanelProConfigCard extends HTMLElement {
   constructor() {
     super();
     this.attachShadow({ mode: 'open' });
     this._config = {};
     this._hass = null;
-    this._entities = {
-      lights: [],
-      covers: [],
-      climates: [],
-    };
-    this._selectedEntities = {
-      lights: [],
-      covers: [],
-      climates: [],
-    };
+    this._entities = emptyLists();
+    this._selectedEntities = emptyLists();
+    this._search = '';
+    this._searchTimer = null;
+    this._catalogRequest = 0;
+    this._unsubCatalog = null;
+    this._dirtyLists = new Set();
+    this._frame = null;
+    this._build();
   }
 
   static getConfigElement() {
@@ -38,41 +83,122 @@ class NSPanelProConfigCard extends HTMLElement {
       panel_id: 'panel1',
       ...config,
     };
-    this._render();
+    this._updateHeader();
   }
 
   set hass(hass) {
+    const first = !this._hass;
     this._hass = hass;
-    this._updateEntities();
-    this._render();
+    // Entity lists come from the integration's catalog, so state changes
+    // elsewhere in the house do not re-render the card
+    if (first && this.isConnected) {
+      this._subscribeCatalog();
+    }
   }
 
-  _updateEntities() {
-    if (!this._hass) return;
+  connectedCallback() {
+    if (this._hass) {
+      this._subscribeCatalog();
+    }
+  }
 
-    this._entities = {
-      lights: Object.keys(this._hass.states)
-        .filter((e) => e.startsWith('light.'))
-        .map((e) => ({
-          entity_id: e,
-          name: this._hass.states[e].attributes.friendly_name || e,
-          state: this._hass.states[e].state,
-        })),
-      covers: Object.keys(this._hass.states)
-        .filter((e) => e.startsWith('cover.'))
-        .map((e) => ({
-          entity_id: e,
-          name: this._hass.states[e].attributes.friendly_name || e,
-          state: this._hass.states[e].state,
-        })),
-      climates: Object.keys(this._hass.states)
-        .filter((e) => e.startsWith('climate.'))
-        .map((e) => ({
-          entity_id: e,
-          name: this._hass.states[e].attributes.friendly_name || e,
-          state: this._hass.states[e].state,
-        })),
-    };
+  disconnectedCallback() {
+    this._unsubscribeCatalog();
+  }
+
+  _unsubscribeCatalog() {
+    if (this._unsubCatalog) {
+      this._unsubCatalog.then((unsub) => unsub());
+      this._unsubCatalog = null;
+    }
+  }
+
+  _subscribeCatalog() {
+    if (this._unsubCatalog) return;
+
+    this._unsubCatalog = this._hass.connection.subscribeMessage(
+      (event) => {
+        if (event.invalidated) {
+          // The integration was reloaded, follow its new catalog
+          this._unsubscribeCatalog();
+          this._subscribeCatalog();
+        } else {
+          this._applyCatalogChanges(event);
+        }
+      },
+      { type: 'nspanelpro/catalog/subscribe' }
+    );
+    this._loadCatalog();
+  }
+
+  async _loadCatalog() {
+    // A slow response to an earlier search must not replace a newer one
+    const request = ++this._catalogRequest;
+    const entities = emptyLists();
+    let offset = 0;
+    let page;
+    do {
+      page = await this._hass.connection.sendMessagePromise({
+        type: 'nspanelpro/catalog',
+        search: this._search || undefined,
+        offset,
+        limit: CATALOG_PAGE_SIZE,
+      });
+      if (request !== this._catalogRequest) return;
+      page.entities.forEach((entry) => entities[DOMAIN_TYPES[entry.domain]].push(entry));
+      offset += page.entities.length;
+    } while (page.entities.length && offset < page.total);
+
+    this._entities = entities;
+    this._scheduleUpdate(...Object.keys(this._lists));
+  }
+
+  _matchesSearch(entry) {
+    const search = this._search.toLowerCase();
+    return (
+      !search ||
+      entry.name.toLowerCase().includes(search) ||
+      entry.entity_id.includes(search)
+    );
+  }
+
+  _applyCatalogChanges({ changed, removed }) {
+    const dirty = new Set();
+
+    removed.forEach((entityId) => {
+      const type = DOMAIN_TYPES[entityId.split('.')[0]];
+      const list = this._entities[type];
+      const index = list.findIndex((e) => e.entity_id === entityId);
+      if (index !== -1) {
+        list.splice(index, 1);
+        dirty.add(type);
+      }
+    });
+
+    changed.forEach((entry) => {
+      const type = DOMAIN_TYPES[entry.domain];
+      const list = this._entities[type];
+      const index = list.findIndex((e) => e.entity_id === entry.entity_id);
+      if (index !== -1) {
+        list[index] = entry;
+        dirty.add(type);
+      } else if (this._matchesSearch(entry)) {
+        list.push(entry);
+        list.sort((a, b) => a.name.localeCompare(b.name));
+        dirty.add(type);
+      }
+    });
+
+    // Only the rows of changed entities are patched
+    if (dirty.size) {
+      this._scheduleUpdate(...dirty);
+    }
+  }
+
+  _setSearch(search) {
+    this._search = search;
+    clearTimeout(this._searchTimer);
+    this._searchTimer = setTimeout(() => this._loadCatalog(), SEARCH_DELAY);
   }
 
   _toggleEntity(type, entityId) {
@@ -82,7 +208,7 @@ class NSPanelProConfigCard extends HTMLElement {
     } else {
       this._selectedEntities[type].splice(index, 1);
     }
-    this._render();
+    this._scheduleUpdate(type);
   }
 
   _publishConfig() {
@@ -94,11 +220,10 @@ class NSPanelProConfigCard extends HTMLElement {
       timestamp: new Date().toISOString(),
     };
 
-    // Publish configuration to MQTT
-    this._hass.callService('mqtt', 'publish', {
-      topic: `domodreams/nspanelpro/config/${this._config.panel_id}`,
-      payload: JSON.stringify(config),
-      retain: true,
+    // The integration skips unchanged configs and sends versioned diffs
+    this._hass.callService('nspanelpro', 'send_config', {
+      panel_id: this._config.panel_id,
+      config,
     });
 
     this._showNotification('Configuration published to panel!');
@@ -113,7 +238,7 @@ class NSPanelProConfigCard extends HTMLElement {
     this.dispatchEvent(event);
   }
 
-  _render() {
+  _build() {
     const styles = `
       <style>
         :host {
@@ -160,13 +285,21 @@ class NSPanelProConfigCard extends HTMLElement {
         .section-header .icon {
           width: 20px;
           height: 20px;
+          --mdc-icon-size: 20px;
         }
         .entity-list {
-          display: grid;
-          grid-template-columns: repeat(auto-fill, minmax(200px, 1fr));
-          gap: 8px;
+          position: relative;
+          max-height: ${LIST_HEIGHT}px;
+          overflow-y: auto;
+        }
+        .entity-list-inner {
+          position: relative;
         }
         .entity-item {
+          position: absolute;
+          top: 0;
+          box-sizing: border-box;
+          height: ${ROW_HEIGHT - ROW_GAP}px;
           display: flex;
           align-items: center;
           gap: 8px;
@@ -174,9 +307,16 @@ class NSPanelProConfigCard extends HTMLElement {
           background: var(--secondary-background-color);
           border-radius: 8px;
           cursor: pointer;
-          transition: all 0.2s ease;
+          transition: background 0.2s ease, border-color 0.2s ease;
           border: 2px solid transparent;
         }
+        .empty {
+          color: var(--secondary-text-color);
+          font-style: italic;
+        }
+        [hidden] {
+          display: none !important;
+        }
         .entity-item:hover {
           background: var(--primary-color);
           color: white;
@@ -249,11 +389,13 @@ class NSPanelProConfigCard extends HTMLElement {
         }
         .stats {
           display: flex;
+          flex-wrap: wrap;
           gap: 16px;
           margin-bottom: 16px;
         }
         .stat {
           flex: 1;
+          min-width: 72px;
           text-align: center;
           padding: 12px;
           background: var(--secondary-background-color);
@@ -276,6 +418,17 @@ class NSPanelProConfigCard extends HTMLElement {
           border-radius: 8px;
           margin-bottom: 16px;
         }
+        .search {
+          width: 100%;
+          box-sizing: border-box;
+          padding: 8px 12px;
+          margin-bottom: 16px;
+          border: 1px solid var(--divider-color);
+          border-radius: 8px;
+          background: var(--secondary-background-color);
+          color: var(--primary-text-color);
+          font-size: 1em;
+        }
         .mqtt-info code {
           background: var(--primary-color);
           color: white;
@@ -290,79 +443,53 @@ class NSPanelProConfigCard extends HTMLElement {
     const coverIcon = `<svg class="icon" viewBox="0 0 24 24" fill="currentColor"><path d="M3 4h18v2H3V4m0 4h18v2H3V8m0 4h18v2H3v-2m0 4h18v2H3v-2m0 4h18v2H3v-2Z"/></svg>`;
     const climateIcon = `<svg class="icon" viewBox="0 0 24 24" fill="currentColor"><path d="M17.66 11.2c-.23-.3-.51-.56-.77-.82-.67-.6-1.43-1.03-2.07-1.66C13.33 7.26 13 4.85 13.95 3c-.95.23-1.78.75-2.49 1.32-2.59 2.08-3.61 5.75-2.39 8.9.04.1.08.2.08.33 0 .22-.15.42-.35.5-.23.1-.47.04-.66-.12a.58.58 0 0 1-.14-.17c-1.13-1.43-1.31-3.48-.55-5.12C5.78 10 4.87 12.3 5 14.47c.06.5.12 1 .29 1.5.14.6.41 1.2.71 1.73 1.08 1.73 2.95 2.97 4.96 3.22 2.14.27 4.43-.12 6.07-1.6 1.83-1.66 2.47-4.32 1.53-6.6l-.13-.26c-.21-.46-.77-1.26-.77-1.26m-3.16 6.3c-.28.24-.74.5-1.1.6-1.12.4-2.24-.16-2.9-.82 1.19-.28 1.9-1.16 2.11-2.05.17-.8-.15-1.46-.28-2.23-.12-.74-.1-1.37.17-2.06.19.38.39.76.63 1.06.77 1 1.98 1.44 2.24 2.8.04.14.06.28.06.43.03.82-.33 1.72-.93 2.27Z"/></svg>`;
 
-    const renderEntityList = (type, entities, icon) => {
-      if (entities.length === 0) {
-        return `<div style="color: var(--secondary-text-color); font-style: italic;">No ${type} entities found</div>`;
-      }
-      return `
-        <div class="entity-list">
-          ${entities
-            .map(
-              (e) => `
-            <div class="entity-item ${this._selectedEntities[type].includes(e.entity_id) ? 'selected' : ''}" 
-                 data-type="${type}" 
-                 data-entity="${e.entity_id}">
-              <div class="checkbox"></div>
-              <span class="entity-name">${e.name}</span>
-              <span class="entity-state">${e.state}</span>
-            </div>
-          `
-            )
-            .join('')}
+    const section = (type, icon, label) => `
+        <div class="section">
+          <div class="section-header">${icon} ${label}</div>
+          <div class="empty" data-empty="${type}">No ${label.toLowerCase()} entities found</div>
+          <div class="entity-list" data-type="${type}">
+            <div class="entity-list-inner"></div>
+          </div>
         </div>
-      `;
-    };
+    `;
 
-    const totalSelected =
-      this._selectedEntities.lights.length +
-      this._selectedEntities.covers.length +
-      this._selectedEntities.climates.length;
+    const stat = (type, label) => `
+          <div class="stat">
+            <div class="stat-value" data-stat="${type}">0</div>
+            <div class="stat-label">${label}</div>
+          </div>
+    `;
+
+    const mdiIcon = (type) => `<ha-icon class="icon" icon="${TYPE_ICONS[type]}"></ha-icon>`;
+    const icons = { lights: lightIcon, covers: coverIcon, climates: climateIcon };
+    const types = Object.values(DOMAIN_TYPES);
 
+    // Built once; entity rows are patched in place by _updateList
     this.shadowRoot.innerHTML = `
       ${styles}
       <div class="card">
         <div class="header">
-          <span class="title">${this._config.title}</span>
-          <span class="panel-id">${this._config.panel_id}</span>
+          <span class="title"></span>
+          <span class="panel-id"></span>
         </div>
 
         <div class="mqtt-info">
           MQTT Base Topic: <code>domodreams/nspanelpro/</code>
         </div>
 
+        <input class="search" id="search" type="search" placeholder="Search entities" />
+
         <div class="stats">
+          ${types.map((type) => stat(type, TYPE_LABELS[type])).join('')}
           <div class="stat">
-            <div class="stat-value">${this._entities.lights.length}</div>
-            <div class="stat-label">Lights</div>
-          </div>
-          <div class="stat">
-            <div class="stat-value">${this._entities.covers.length}</div>
-            <div class="stat-label">Covers</div>
-          </div>
-          <div class="stat">
-            <div class="stat-value">${this._entities.climates.length}</div>
-            <div class="stat-label">Climates</div>
-          </div>
-          <div class="stat">
-            <div class="stat-value">${totalSelected}</div>
+            <div class="stat-value" data-stat="selected">0</div>
             <div class="stat-label">Selected</div>
           </div>
         </div>
 
-        <div class="section">
-          <div class="section-header">${lightIcon} Lights</div>
-          ${renderEntityList('lights', this._entities.lights, lightIcon)}
-        </div>
-
-        <div class="section">
-          <div class="section-header">${coverIcon} Covers</div>
-          ${renderEntityList('covers', this._entities.covers, coverIcon)}
-        </div>
-
-        <div class="section">
-          <div class="section-header">${climateIcon} Climate</div>
-          ${renderEntityList('climates', this._entities.climates, climateIcon)}
-        </div>
+        ${types
+          .map((type) => section(type, icons[type] || mdiIcon(type), TYPE_LABELS[type]))
+          .join('')}
 
         <div class="actions">
           <button class="btn btn-secondary" id="clear-btn">Clear Selection</button>
@@ -371,25 +498,158 @@ class NSPanelProConfigCard extends HTMLElement {
       </div>
     `;
 
-    // Add event listeners
-    this.shadowRoot.querySelectorAll('.entity-item').forEach((item) => {
-      item.addEventListener('click', () => {
-        const type = item.dataset.type;
-        const entityId = item.dataset.entity;
-        this._toggleEntity(type, entityId);
+    this._lists = {};
+    this.shadowRoot.querySelectorAll('.entity-list').forEach((element) => {
+      const type = element.dataset.type;
+      this._lists[type] = {
+        element,
+        inner: element.firstElementChild,
+        empty: this.shadowRoot.querySelector(`[data-empty="${type}"]`),
+        rows: new Map(),
+      };
+      element.addEventListener('scroll', () => this._scheduleUpdate(type), {
+        passive: true,
+      });
+      element.addEventListener('click', (ev) => {
+        const row = ev.target.closest('.entity-item');
+        if (row) {
+          this._toggleEntity(type, row.dataset.entity);
+        }
       });
     });
 
-    this.shadowRoot.getElementById('publish-btn')?.addEventListener('click', () => {
+    // Column count depends on the card width
+    this._resizeObserver = new ResizeObserver(() =>
+      this._scheduleUpdate(...Object.keys(this._lists))
+    );
+    Object.values(this._lists).forEach(({ element }) =>
+      this._resizeObserver.observe(element)
+    );
+
+    this.shadowRoot
+      .getElementById('search')
+      .addEventListener('input', (ev) => this._setSearch(ev.target.value));
+
+    this.shadowRoot.getElementById('publish-btn').addEventListener('click', () => {
       this._publishConfig();
     });
 
-    this.shadowRoot.getElementById('clear-btn')?.addEventListener('click', () => {
-      this._selectedEntities = { lights: [], covers: [], climates: [] };
-      this._render();
+    this.shadowRoot.getElementById('clear-btn').addEventListener('click', () => {
+      this._selectedEntities = emptyLists();
+      this._scheduleUpdate(...Object.keys(this._lists));
     });
   }
 
+  _updateHeader() {
+    this.shadowRoot.querySelector('.title').textContent = this._config.title;
+    this.shadowRoot.querySelector('.panel-id').textContent = this._config.panel_id;
+  }
+
+  _scheduleUpdate(...types) {
+    types.forEach((type) => this._dirtyLists.add(type));
+    if (this._frame) return;
+
+    // Coalesce all changes of a frame into one DOM update
+    this._frame = requestAnimationFrame(() => {
+      this._frame = null;
+      this._dirtyLists.forEach((type) => this._updateList(type));
+      this._dirtyLists.clear();
+      this._updateStats();
+    });
+  }
+
+  _updateStats() {
+    const stats = { selected: 0 };
+    Object.keys(this._entities).forEach((type) => {
+      stats[type] = this._entities[type].length;
+      stats.selected += this._selectedEntities[type].length;
+    });
+    this.shadowRoot.querySelectorAll('[data-stat]').forEach((element) => {
+      element.textContent = stats[element.dataset.stat];
+    });
+  }
+
+  _updateList(type) {
+    const { element, inner, empty, rows } = this._lists[type];
+    const entities = this._entities[type];
+    const selected = this._selectedEntities[type];
+
+    empty.hidden = entities.length > 0;
+    element.hidden = entities.length === 0;
+
+    // Only rows inside the scrolled viewport (plus a margin) exist in the DOM
+    const columns = Math.max(1, Math.floor(element.clientWidth / MIN_COLUMN_WIDTH));
+    const rowCount = Math.ceil(entities.length / columns);
+    const viewport = element.clientHeight || LIST_HEIGHT;
+    const firstRow = Math.max(0, Math.floor(element.scrollTop / ROW_HEIGHT) - OVERSCAN_ROWS);
+    const lastRow = Math.min(
+      rowCount,
+      Math.ceil((element.scrollTop + viewport) / ROW_HEIGHT) + OVERSCAN_ROWS
+    );
+    inner.style.height = `${rowCount * ROW_HEIGHT}px`;
+
+    const visible = new Set();
+    const end = Math.min(entities.length, lastRow * columns);
+    for (let index = firstRow * columns; index < end; index++) {
+      const entry = entities[index];
+      let row = rows.get(entry.entity_id);
+      if (!row) {
+        row = this._createRow(entry.entity_id);
+        rows.set(entry.entity_id, row);
+        inner.appendChild(row.element);
+      }
+      this._patchRow(row, entry, index, columns, selected.includes(entry.entity_id));
+      visible.add(entry.entity_id);
+    }
+
+    rows.forEach((row, entityId) => {
+      if (!visible.has(entityId)) {
+        row.element.remove();
+        rows.delete(entityId);
+      }
+    });
+  }
+
+  _createRow(entityId) {
+    const element = document.createElement('div');
+    element.className = 'entity-item';
+    element.dataset.entity = entityId;
+    element.innerHTML =
+      '<div class="checkbox"></div><span class="entity-name"></span><span class="entity-state"></span>';
+    return {
+      element,
+      name: element.children[1],
+      state: element.children[2],
+      entry: null,
+      position: null,
+      selected: null,
+    };
+  }
+
+  _patchRow(row, entry, index, columns, selected) {
+    // Catalog updates replace entries, so identity tells what changed
+    if (row.entry !== entry) {
+      if (row.entry?.name !== entry.name) row.name.textContent = entry.name;
+      if (row.entry?.state !== entry.state) row.state.textContent = entry.state;
+      row.entry = entry;
+    }
+
+    if (row.selected !== selected) {
+      row.element.classList.toggle('selected', selected);
+      row.selected = selected;
+    }
+
+    const position = `${index}/${columns}`;
+    if (row.position !== position) {
+      const column = index % columns;
+      const style = row.element.style;
+      style.transform = `translateY(${Math.floor(index / columns) * ROW_HEIGHT}px)`;
+      style.width = `calc((100% - ${(columns - 1) * ROW_GAP}px) / ${columns})`;
+      style.left = `calc(${column} * (100% + ${ROW_GAP}px) / ${columns})`;
+      row.position = position;
+    }
+  }
+
   getCardSize() {
     return 6;
   }
@@ -478,7 +738,7 @@ window.customCards.push({
 });
 
 console.info(
-  '%c NSPANELPRO-CONFIG-CARD %c v1.0.0 %c by DomoDreams ',
+  '%c NSPANELPRO-CONFIG-CARD %c v1.1.0 %c by DomoDreams ',
   'color: white; background: #3498db; font-weight: bold;',
   'color: #3498db; background: white; font-weight: bold;',
   'color: white; background: #2ecc71; font-weight: bold;'
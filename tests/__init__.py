@@ -0,0 +1 @@
+"""Tests for the NSPanel Pro integration."""
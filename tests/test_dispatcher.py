@@ -0,0 +1,50 @@
+"""Tests for the command dispatcher of the NSPanel Pro integration."""
+import asyncio
+
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_mqtt_message,
+    async_mock_service,
+)
+
+from custom_components.nspanelpro.const import (
+    CONF_PANEL_ID,
+    CONF_PANEL_NAME,
+    DEFAULT_BATCH_WINDOW,
+    DOMAIN,
+    MQTT_BASE_TOPIC,
+)
+
+
+# The MQTT client keeps its periodic timer until Home Assistant stops
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+async def test_command_runs_once_with_many_entries(hass, mqtt_mock):
+    """A command reaches the service layer once, whatever the entry count."""
+    calls = async_mock_service(hass, "light", "turn_on")
+    hass.states.async_set("light.x", "off")
+
+    entries = []
+    for index in range(10):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={CONF_PANEL_ID: f"panel{index}", CONF_PANEL_NAME: f"Panel {index}"},
+            unique_id=f"panel{index}",
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+    # Setting up one entry sets up every entry of the domain
+    assert await hass.config_entries.async_setup(entries[0].entry_id)
+    await hass.async_block_till_done()
+
+    async_fire_mqtt_message(hass, f"{MQTT_BASE_TOPIC}/cmd/light/x/set", "ON")
+    # Commands are collected for the batch window before they are run
+    await asyncio.sleep(DEFAULT_BATCH_WINDOW / 1000 * 2)
+    await hass.async_block_till_done()
+
+    assert len(calls) == 1
+    assert calls[0].data["entity_id"] == "light.x"
+
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,62 @@
+"""Tests for the state push engine of the NSPanel Pro integration."""
+import json
+
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_mqtt_message,
+)
+
+from custom_components.nspanelpro.const import (
+    CONF_DELTA_UPDATES,
+    CONF_PANEL_ID,
+    CONF_PANEL_NAME,
+    CONF_PAYLOAD_ENCODING,
+    DOMAIN,
+    ENCODING_COMPACT_JSON,
+    MQTT_CONFIG_TOPIC,
+)
+
+
+# The MQTT client keeps its periodic timer until Home Assistant stops
+@pytest.mark.parametrize("expected_lingering_timers", [True])
+@pytest.mark.parametrize("delta_updates", [False, True])
+async def test_unprojected_change_publishes_nothing(
+    hass, mqtt_mock, freezer: FrozenDateTimeFactory, delta_updates
+):
+    """A change the panel does not show is not published, whatever its time."""
+    hass.states.async_set("light.x", "on", {"brightness": 3, "effect": "none"})
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_PANEL_ID: "panel0", CONF_PANEL_NAME: "Panel 0"},
+        options={
+            CONF_PAYLOAD_ENCODING: ENCODING_COMPACT_JSON,
+            CONF_DELTA_UPDATES: delta_updates,
+        },
+        unique_id="panel0",
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    async_fire_mqtt_message(
+        hass,
+        MQTT_CONFIG_TOPIC.format(panel_id="panel0"),
+        json.dumps({"entities": {"lights": ["light.x"]}}),
+    )
+    await hass.async_block_till_done()
+    mqtt_mock.async_publish.reset_mock()
+
+    # A later second gives the new state another last_updated time
+    freezer.tick(5)
+    hass.states.async_set("light.x", "on", {"brightness": 3, "effect": "rainbow"})
+    await hass.async_block_till_done()
+    assert not mqtt_mock.async_publish.called
+
+    freezer.tick(5)
+    hass.states.async_set("light.x", "on", {"brightness": 5, "effect": "rainbow"})
+    await hass.async_block_till_done()
+    assert mqtt_mock.async_publish.call_count == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)